@@ -6,6 +6,12 @@ Google Gemini API ile analiz fonksiyonları
 
 import json
 import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from cache_utils import JsonDiskCache, TTLCache, cache_key
 
 try:
     from google import genai
@@ -15,28 +21,115 @@ except Exception:
     types = None
     print("[WARN] google-genai not available. AI analysis will be skipped.")
 
+# LLM yanıt önbelleği: anahtar = (model, prompt metni, thinking_budget)
+LLM_CACHE_TTL = float(os.getenv('LLM_CACHE_TTL', str(24 * 3600)))  # saniye, 0 = süresiz
+LLM_CACHE_DIR = os.getenv('LLM_CACHE_DIR', os.path.join('output', 'llm_cache'))  # '' = disk katmanı kapalı
+LLM_CACHE_MAX_ENTRIES = int(os.getenv('LLM_CACHE_MAX_ENTRIES', '256'))
+LLM_CACHE_MAX_BYTES = int(float(os.getenv('LLM_CACHE_MAX_MB', '256')) * 1024 ** 2)  # Disk katmanı sınırı
+# Sayısal değerleri bu kadar ondalığa yuvarla: neredeyse aynı özetler aynı anahtara düşer ('' = kapalı)
+LLM_CACHE_ROUND_DIGITS = os.getenv('LLM_CACHE_ROUND_DIGITS', '2')
+# Her çalıştırmada değişen, modelin ihtiyaç duymadığı alanlar (prompt'a girmez)
+LLM_PROMPT_IGNORED_KEYS = ('map_path', 'quick_plot_path')
+
+llm_memory_cache = TTLCache(max_entries=LLM_CACHE_MAX_ENTRIES, ttl=LLM_CACHE_TTL)
+llm_disk_cache = JsonDiskCache(LLM_CACHE_DIR, ttl=LLM_CACHE_TTL, max_bytes=LLM_CACHE_MAX_BYTES) if LLM_CACHE_DIR else None
+_llm_stats_lock = threading.Lock()
+_llm_stats = {'hits': 0, 'misses': 0, 'saved_tokens': 0, 'saved_latency_s': 0.0, 'api_calls': 0, 'retries': 0}
+
+# Süreç genelinde tek Gemini istemcisi (keep-alive bağlantı havuzu)
+GEMINI_BASE_URL = os.getenv('GEMINI_BASE_URL', '')  # Örn. yerel stub: http://127.0.0.1:8765
+GEMINI_TIMEOUT_MS = int(os.getenv('GEMINI_TIMEOUT_MS', '120000'))
+GEMINI_MAX_CONNECTIONS = int(os.getenv('GEMINI_MAX_CONNECTIONS', '16'))
+GEMINI_MAX_CONCURRENCY = int(os.getenv('GEMINI_MAX_CONCURRENCY', '4'))  # Aynı anda açık istek sınırı
+GEMINI_RETRIES = int(os.getenv('GEMINI_RETRIES', '3'))
+GEMINI_RETRY_BACKOFF = float(os.getenv('GEMINI_RETRY_BACKOFF', '1.0'))  # saniye, her denemede 2 katı
+
+_client_lock = threading.Lock()
+_client_state = {'client': None, 'api_key': None}
+_gemini_slots = threading.BoundedSemaphore(max(1, GEMINI_MAX_CONCURRENCY))
+GEMINI_RATE_LIMIT = float(os.getenv('GEMINI_RATE_LIMIT', '5'))  # istek/saniye (API kotası), 0 = sınırsız
+
+class RateLimiter:
+    """İş parçacığı güvenli jeton kovası (saniyede `rate` istek, `rate` kadar ani yük)"""
+
+    def __init__(self, rate):
+        self.rate = rate
+        self.capacity = max(1.0, rate)
+        self._tokens = self.capacity
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Jeton alınana kadar bekle"""
+        if self.rate <= 0:
+            return
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+                self._last = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+gemini_rate_limiter = RateLimiter(GEMINI_RATE_LIMIT)
+
 def get_api_key():
     """API anahtarını al (environment variable'dan)"""
     return os.getenv('GEMINI_API_KEY', None)
 
-def call_gemini_analysis(analysis_dict, model_name="gemini-2.0-flash-exp", thinking_budget=0, custom_prompt=None):
-    """Gemini ile hava durumu analizi yap"""
+def gemini_available():
+    """google-genai kurulu ve API anahtarı tanımlı mı"""
     if genai is None or types is None:
         print("[WARN] google-genai not installed/importable. Skipping Gemini call.")
-        return None
+        return False
     
     api_key = get_api_key()
     if not api_key or api_key == "skillissue":
         print("[WARN] GEMINI_API_KEY not set. Skipping Gemini call.")
         print("[INFO] Export GEMINI_API_KEY=your_key için: export GEMINI_API_KEY=your_api_key")
-        return None
+        return False
+    return True
 
-    try:
-        client = genai.Client(api_key=api_key)
-        
-        # Use custom prompt if provided, otherwise use default Turkish prompt
-        if custom_prompt:
-            user_text = f"""
+def _http_options():
+    """İstemci HTTP ayarları (base_url, zaman aşımı, bağlantı havuzu sınırları)"""
+    options = {'timeout': GEMINI_TIMEOUT_MS}
+    if GEMINI_BASE_URL:
+        options['base_url'] = GEMINI_BASE_URL
+    if 'client_args' in getattr(types.HttpOptions, 'model_fields', {}):
+        try:
+            import httpx
+            options['client_args'] = {'limits': httpx.Limits(
+                max_connections=GEMINI_MAX_CONNECTIONS,
+                max_keepalive_connections=GEMINI_MAX_CONNECTIONS,
+                keepalive_expiry=60)}
+        except ImportError:
+            pass
+    return types.HttpOptions(**options)
+
+def get_gemini_client():
+    """Tembel oluşturulan, iş parçacıkları arasında paylaşılan istemci (API anahtarı değişirse yenilenir)"""
+    api_key = get_api_key()
+    with _client_lock:
+        if _client_state['client'] is None or _client_state['api_key'] != api_key:
+            _client_state['client'] = genai.Client(api_key=api_key, http_options=_http_options())
+            _client_state['api_key'] = api_key
+        return _client_state['client']
+
+def _is_retryable(error):
+    """Geçici hata mı (429, 5xx, bağlantı/zaman aşımı)"""
+    code = getattr(error, 'code', None)
+    if isinstance(code, int):
+        return code == 429 or code >= 500
+    return isinstance(error, OSError) or type(error).__module__.split('.')[0] in ('httpx', 'httpcore')
+
+def build_analysis_prompt(analysis_dict, custom_prompt=None):
+    """Gemini'ye gönderilecek kullanıcı metnini oluştur"""
+    # Use custom prompt if provided, otherwise use default Turkish prompt
+    if custom_prompt:
+        return f"""
 {custom_prompt}
 
 Weather Data for Analysis:
@@ -44,9 +137,8 @@ Weather Data for Analysis:
 
 Please provide your analysis based on the above context and data.
 """
-        else:
-            # Türkçe prompt (default)
-            user_text = f"""
+    # Türkçe prompt (default)
+    return f"""
 Türkiye bölgesi için hava durumu analizi:
 Tarih Aralığı: {analysis_dict.get('dates')}
 Bölge: {analysis_dict.get('bbox')} (lat/lon)
@@ -65,29 +157,273 @@ Lütfen aşağıdaki formatta Türkçe analiz yapın:
 
 JSON formatında yanıt verin: {{"ozet": "...", "riskler": {{"tarim": "...", "saglik": "...", "ulasim": "..."}}, "oneriler": ["...", "...", "..."]}}
 """
+
+def _round_values(value, digits):
+    """Sözlük/liste içindeki float değerleri yuvarla"""
+    if isinstance(value, float):
+        return round(value, digits)
+    if isinstance(value, dict):
+        return {k: _round_values(v, digits) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_round_values(v, digits) for v in value]
+    return value
+
+def normalize_analysis_input(analysis_dict):
+    """Prompt'a girecek özeti sadeleştir (değişken alanları çıkar, sayıları yuvarla)"""
+    data = {k: v for k, v in analysis_dict.items() if k not in LLM_PROMPT_IGNORED_KEYS}
+    if LLM_CACHE_ROUND_DIGITS != '':
+        data = _round_values(data, int(LLM_CACHE_ROUND_DIGITS))
+    return data
+
+def llm_cache_lookup(key):
+    """Önbellekteki yanıt kaydı ({'text', 'tokens', 'latency_s'}) veya None"""
+    entry = llm_memory_cache.get(key)
+    source = 'memory'
+    if entry is None and llm_disk_cache is not None:
+        item = llm_disk_cache.get(key)
+        if item is not None:
+            created, entry = item
+            llm_memory_cache.set(key, entry, created=created)
+            source = 'disk'
+    with _llm_stats_lock:
+        if entry is None:
+            _llm_stats['misses'] += 1
+            return None
+        _llm_stats['hits'] += 1
+        _llm_stats['saved_tokens'] += entry.get('tokens') or 0
+        _llm_stats['saved_latency_s'] += entry.get('latency_s') or 0.0
+    print(f"[CACHE] Gemini yanıtı önbellekten ({source})")
+    return entry
+
+def llm_cache_store(key, text, tokens, latency_s):
+    """Tamamlanan yanıtı bellek ve disk önbelleğine yaz"""
+    entry = {'text': text, 'tokens': tokens, 'latency_s': round(latency_s, 3)}
+    llm_memory_cache.set(key, entry)
+    if llm_disk_cache is not None:
+        try:
+            llm_disk_cache.set(key, entry)
+        except Exception as e:
+            print(f"[WARN] LLM cache yazılamadı: {e}")
+
+def llm_cache_stats():
+    """Önbellek ve API çağrı metrikleri (/api/status için)"""
+    with _llm_stats_lock:
+        stats = dict(_llm_stats)
+    total = stats['hits'] + stats['misses']
+    stats['hit_rate'] = round(stats['hits'] / total, 3) if total else None
+    stats['saved_latency_s'] = round(stats['saved_latency_s'], 3)
+    stats['entries'] = llm_memory_cache.stats()['entries']
+    return stats
+
+def stream_gemini_prompt(user_text, model_name="gemini-2.0-flash-exp", thinking_budget=0):
+    """Hazır prompt için Gemini yanıtını parça parça üret (generator); Gemini kullanılamıyorsa hiçbir şey üretmez
+    
+    Aynı (model, prompt, thinking_budget) için önbellekteki yanıt tek parça olarak üretilir.
+    API hataları çağırana iletilir.
+    """
+    key = cache_key(model_name, user_text, thinking_budget)
+    cached = llm_cache_lookup(key)
+    if cached is not None:
+        yield cached['text']
+        return
+    
+    if not gemini_available():
+        return
+    
+    client = get_gemini_client()
+    contents = [types.Content(role="user", parts=[types.Part.from_text(text=user_text)])]
+    generate_content_config = types.GenerateContentConfig(
+        thinking_config=types.ThinkingConfig(thinking_budget=thinking_budget),
+        tools=[]
+    )
+    
+    print("[LLM] Gemini'ye gönderiliyor...")
+    started = time.time()
+    parts = []
+    tokens = None
+    with _gemini_slots:
+        for attempt in range(GEMINI_RETRIES + 1):
+            gemini_rate_limiter.acquire()
+            with _llm_stats_lock:
+                _llm_stats['api_calls'] += 1
+            try:
+                stream = client.models.generate_content_stream(
+                    model=model_name, contents=contents, config=generate_content_config
+                )
+                try:
+                    for chunk in stream:
+                        usage = getattr(chunk, "usage_metadata", None)
+                        if usage is not None and getattr(usage, "total_token_count", None):
+                            tokens = usage.total_token_count
+                        text = getattr(chunk, "text", None)
+                        if text:
+                            parts.append(text)
+                            yield text
+                finally:
+                    # Çağıran erken bırakırsa (iptal) HTTP akışı da kapansın, yanıtın kalanı beklenmesin
+                    close = getattr(stream, "close", None)
+                    if close is not None:
+                        close()
+                break
+            except Exception as e:
+                # İlk parça gönderildikten sonra tekrar denenemez (çağıran metni almaya başladı)
+                if parts or attempt >= GEMINI_RETRIES or not _is_retryable(e):
+                    raise
+                delay = GEMINI_RETRY_BACKOFF * (2 ** attempt) * random.uniform(0.5, 1.0)
+                print(f"[WARN] Gemini geçici hata ({e}), {delay:.1f} sn sonra tekrar denenecek")
+                with _llm_stats_lock:
+                    _llm_stats['retries'] += 1
+                time.sleep(delay)
+    
+    # Sadece tamamlanmış yanıtlar önbelleğe alınır
+    if parts:
+        text = "".join(parts)
+        # usage_metadata yoksa kaba tahmin (~4 karakter/token)
+        llm_cache_store(key, text, tokens or (len(user_text) + len(text)) // 4, time.time() - started)
+
+def stream_gemini_analysis(analysis_dict, model_name="gemini-2.0-flash-exp", thinking_budget=0, custom_prompt=None):
+    """Analiz özeti için Gemini yanıtını parça parça üret (generator)"""
+    user_text = build_analysis_prompt(normalize_analysis_input(analysis_dict), custom_prompt)
+    yield from stream_gemini_prompt(user_text, model_name, thinking_budget)
+
+def call_gemini_prompt(user_text, model_name="gemini-2.0-flash-exp", thinking_budget=0, on_text=None,
+                       should_cancel=None):
+    """Hazır prompt ile Gemini çağrısı; tam yanıt metni veya hata/Gemini yoksa/iptalde None
+
+    on_text verilirse her parça geldikçe çağrılır (ilerleme akışına kısmi metin için).
+    should_cancel() True dönerse çağrı yapılmaz, akış sürüyorsa kesilir (yarım yanıt önbelleğe girmez).
+    """
+    cancelled = lambda: should_cancel is not None and should_cancel()
+    if cancelled():
+        return None
+    stream = stream_gemini_prompt(user_text, model_name, thinking_budget)
+    try:
+        parts = []
+        for text in stream:
+            print(text, end="", flush=True)
+            parts.append(text)
+            if on_text is not None:
+                on_text(text)
+            if cancelled():
+                print("\n[LLM] İptal edildi, akış kesildi.")
+                return None
         
-        contents = [types.Content(role="user", parts=[types.Part.from_text(text=user_text)])]
-        generate_content_config = types.GenerateContentConfig(
-            thinking_config=types.ThinkingConfig(thinking_budget=thinking_budget),
-            tools=[]
-        )
-
-        print("[LLM] Gemini'ye gönderiliyor...")
-        collected = ""
-        for chunk in client.models.generate_content_stream(
-            model=model_name, contents=contents, config=generate_content_config
-        ):
-            text = getattr(chunk, "text", None)
-            if text:
-                print(text, end="", flush=True)
-                collected += text
-        
+        if not parts:
+            return None
         print("\n[LLM] Analiz tamamlandı.")
-        return collected
+        return "".join(parts)
         
     except Exception as e:
         print(f"[ERROR] Gemini API hatası: {e}")
         return None
+    finally:
+        stream.close()
+
+def call_gemini_analysis(analysis_dict, model_name="gemini-2.0-flash-exp", thinking_budget=0, custom_prompt=None,
+                         on_text=None, should_cancel=None):
+    """Gemini ile hava durumu analizi yap"""
+    user_text = build_analysis_prompt(normalize_analysis_input(analysis_dict), custom_prompt)
+    return call_gemini_prompt(user_text, model_name, thinking_budget, on_text, should_cancel)
+
+def build_batch_prompt(analysis_dicts, custom_prompt=None):
+    """Birden çok özeti tek prompt'ta topla; yanıt sırayla JSON dizisi olarak istenir"""
+    sections = "\n".join(
+        f"Veri {i}:\n{json.dumps(data, indent=2, ensure_ascii=False)}\n" for i, data in enumerate(analysis_dicts))
+    instructions = custom_prompt or """Her veri için ayrı Türkçe analiz yapın:
+1. ÖZET (3 cümle): Genel hava durumu durumu
+2. RİSKLER: Tarım, sağlık ve ulaşım riskleri
+3. ÖNERİLER (3 madde): Pratik öneriler"""
+    return f"""
+Aşağıda {len(analysis_dicts)} farklı bölge/tarih aralığı için hava durumu analiz verileri var.
+{instructions}
+
+{sections}
+Yanıtı sadece JSON dizisi olarak verin, verilerle aynı sırada {len(analysis_dicts)} eleman:
+[{{"id": 0, "ozet": "...", "riskler": {{"tarim": "...", "saglik": "...", "ulasim": "..."}}, "oneriler": ["...", "...", "..."]}}, ...]
+"""
+
+def split_batch_response(text, count):
+    """Paketlenmiş yanıtı elemanlara böl; her eleman JSON metni veya bulunamadıysa None"""
+    items = [None] * count
+    if not text or '[' not in text or ']' not in text:
+        return items
+    try:
+        parsed = json.loads(text[text.index('['):text.rindex(']') + 1])
+    except ValueError:
+        return items
+    if not isinstance(parsed, list):
+        return items
+    for position, item in enumerate(parsed):
+        if not isinstance(item, dict):
+            continue
+        index = item.pop('id', position)
+        if isinstance(index, int) and 0 <= index < count and items[index] is None:
+            items[index] = json.dumps(item, ensure_ascii=False)
+    return items
+
+def call_gemini_batch(analysis_dicts, model_name="gemini-2.0-flash-exp", thinking_budget=0, custom_prompt=None,
+                      pack_size=1, workers=GEMINI_MAX_CONCURRENCY, on_result=None, should_cancel=None):
+    """Birden çok özet için AI analizi; giriş sırasıyla format_analysis_output çıktıları
+    
+    pack_size=1: her özet ayrı istek, `workers` kadar eşzamanlı (hız sınırı gemini_rate_limiter ile).
+    pack_size>1: her prompt'a en fazla pack_size özet konur, JSON dizisi yanıt bölünür;
+    yanıtta eksik kalan özetler tek tek sorulur. on_result(index, çıktı) her sonuç hazır olduğunda çağrılır.
+    should_cancel() True dönerse yeni API çağrısı yapılmaz, süren akışlar kesilir (sonuçları None kalır);
+    ilk hatada kuyruktaki gruplar iptal edilir.
+    """
+    results = [None] * len(analysis_dicts)
+    
+    def cancelled():
+        return should_cancel is not None and should_cancel()
+    
+    def finish(index, response):
+        results[index] = format_analysis_output(response, analysis_dicts[index])
+        if on_result is not None:
+            on_result(index, results[index])
+    
+    def run_group(indices):
+        if cancelled():
+            return
+        if len(indices) == 1:
+            response = call_gemini_analysis(analysis_dicts[indices[0]], model_name, thinking_budget, custom_prompt,
+                                            should_cancel=should_cancel)
+            if not cancelled():  # Akış iptalle kesildiyse yarım/boş yanıt sonuç sayılmaz
+                finish(indices[0], response)
+            return
+        user_text = build_batch_prompt([normalize_analysis_input(analysis_dicts[i]) for i in indices], custom_prompt)
+        responses = split_batch_response(call_gemini_prompt(user_text, model_name, thinking_budget,
+                                                            should_cancel=should_cancel), len(indices))
+        # Bir elemanın on_result hatası diğer elemanların sonucunu atlatmasın; ilk hata sonda yükseltilir
+        error = None
+        for index, response in zip(indices, responses):
+            if response is None:
+                if cancelled():
+                    continue
+                response = call_gemini_analysis(analysis_dicts[index], model_name, thinking_budget, custom_prompt,
+                                                should_cancel=should_cancel)
+                if cancelled():
+                    continue
+            try:
+                finish(index, response)
+            except Exception as e:
+                error = error or e
+        if error is not None:
+            raise error
+    
+    pack_size = max(1, pack_size)
+    groups = [list(range(len(analysis_dicts)))[i:i + pack_size] for i in range(0, len(analysis_dicts), pack_size)]
+    if not groups:
+        return results
+    pool = ThreadPoolExecutor(max_workers=max(1, min(workers, len(groups))))
+    try:
+        for future in as_completed([pool.submit(run_group, group) for group in groups]):
+            future.result()
+    except BaseException:
+        # Başlamamış grupları iptal et (API harcaması durur), sadece çalışanları bekle
+        pool.shutdown(wait=True, cancel_futures=True)
+        raise
+    pool.shutdown(wait=True)
+    return results
 
 def format_analysis_output(gemini_response, summary):
     """Gemini yanıtını güzel formatla"""
@@ -11,8 +11,7 @@ from datetime import datetime
 
 # Kendi modüllerimizi import et
 from weather_utils import (
-    ensure_output_dir, login_earthaccess, fetch_weather_data, 
-    extract_variables, process_variables, create_summary
+    ensure_output_dir, login_earthaccess, fetch_and_process, create_summary
 )
 from plotting_utils import plot_weather_map, create_quick_plot
 from ai_analysis import call_gemini_analysis, format_analysis_output
@@ -58,14 +57,8 @@ def main():
     try:
         # 1. Veri çekme
         print(f"\n📡 {user_dates[0]} - {user_dates[1]} için veri çekiliyor...")
-        datasets = fetch_weather_data(dates=user_dates)
-        
-        # 2. Değişkenleri çıkarma
-        print("🔄 Veri işleniyor...")
-        variables = extract_variables(datasets)
-        
-        # 3. Veri işleme
-        processed_data = process_variables(variables)
+        # 2-3. Değişkenleri çıkarma ve işleme (günlük depodaki günler tekrar çekilmez)
+        processed_data, _ = fetch_and_process(dates=user_dates)
         
         # 4. Özet oluşturma
         summary = create_summary(processed_data, user_dates)
@@ -0,0 +1,289 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+NASA Weather Analysis - Benchmarks
+Performans ölçüm betikleri (sentetik MERRA-2 benzeri veri ile, ağ gerektirmez)
+
+Kullanım:
+    python benchmarks.py granules --counts 1 24 168 744
+    python benchmarks.py subset --steps 24
+    python benchmarks.py drought --repeat 20
+    python benchmarks.py ai --requests 32 --concurrency 4
+    python benchmarks.py render --repeat 5
+"""
+
+import argparse
+import os
+import shutil
+import tempfile
+import threading
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+import xarray as xr
+
+from weather_utils import BBOX, drought_index_kernel, open_granules, subset_time_space
+
+# MERRA-2 global ızgarası (0.5° x 0.625°)
+MERRA2_LAT = np.linspace(-90, 90, 361)
+MERRA2_LON = np.linspace(-180, 179.375, 576)
+
+def make_synthetic_granules(directory, count, steps_per_file=1, lat=MERRA2_LAT, lon=MERRA2_LON):
+    """Sentetik M2T1 benzeri granül dosyaları üret"""
+    paths = []
+    start = pd.Timestamp("2025-09-01T00:30:00")
+    rng = np.random.default_rng(0)
+    for i in range(count):
+        times = start + pd.to_timedelta(np.arange(steps_per_file) + i * steps_per_file, unit='h')
+        data = (280 + 10 * rng.standard_normal((steps_per_file, lat.size, lon.size))).astype('float32')
+        ds = xr.Dataset({'T2M': (('time', 'lat', 'lon'), data)},
+                        coords={'time': times, 'lat': lat, 'lon': lon})
+        path = os.path.join(directory, f"MERRA2_synthetic.{i:04d}.nc4")
+        ds.to_netcdf(path)
+        paths.append(path)
+    return paths
+
+def bench_granules(counts, max_open_files):
+    """Granül sayısına göre okuma verimini ölç"""
+    tmpdir = tempfile.mkdtemp(prefix="bench_granules_")
+    try:
+        print(f"[BENCH] {max(counts)} sentetik granül üretiliyor: {tmpdir}")
+        paths = make_synthetic_granules(tmpdir, max(counts))
+        lon_min, lat_min, lon_max, lat_max = BBOX
+
+        print(f"{'granül':>8} {'açılış (s)':>12} {'okuma (s)':>12} {'toplam (s)':>12} {'granül/s':>10}")
+        for n in counts:
+            t0 = time.perf_counter()
+            ds = open_granules(paths[:n], max_open_files=max_open_files)
+            t1 = time.perf_counter()
+            region = ds['T2M'].sel(lon=slice(lon_min, lon_max), lat=slice(lat_min, lat_max))
+            float(region.mean())
+            t2 = time.perf_counter()
+            ds.close()
+            total = t2 - t0
+            print(f"{n:>8} {t1 - t0:>12.3f} {t2 - t1:>12.3f} {total:>12.3f} {n / total:>10.1f}")
+    finally:
+        shutil.rmtree(tmpdir, ignore_errors=True)
+
+def _subset_time_space_legacy(da, time_index=0, bbox=BBOX):
+    """Eski subset_time_space: önce tüm küpte boylam düzeltme + sıralama"""
+    lon_min, lat_min, lon_max, lat_max = bbox
+    if 'lon' in da.coords:
+        if float(da.coords['lon'].max()) > 180:
+            da = da.assign_coords(lon=(((da.lon + 180) % 360) - 180)).sortby('lon')
+    if 'time' in da.dims:
+        da = da.isel(time=time_index)
+    return da.sel(lon=slice(lon_min, lon_max), lat=slice(lat_min, lat_max))
+
+def _subset_reference(da, bbox):
+    """Bağımsız referans: tüm küpte bbox çerçevesine göre boylam + sıralama + seçim"""
+    lon_min, lat_min, lon_max, lat_max = bbox
+    da = da.isel(time=0).assign_coords(lon=lon_min + ((da.lon - lon_min) % 360)).sortby('lon')
+    return da.sel(lon=slice(lon_min, lon_max), lat=slice(lat_min, lat_max))
+
+# Eşitlik kontrolü yapılan ek kutular: antimeridyen ve tam küre
+SUBSET_CHECK_BBOXES = [(170, -10, 190, 10), (-190, -10, -170, 10), (-180, -90, 180, 90), (0, -90, 360, 90)]
+
+def _measure(func, *args, repeat=5):
+    """Ortalama süre (s) ve tepe bellek (MB) ölç"""
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        result = func(*args)
+        np.asarray(result.values)
+    elapsed = (time.perf_counter() - t0) / repeat
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak / 1024 ** 2, result
+
+def bench_subset(steps, repeat):
+    """subset_time_space: eski ve yeni yol karşılaştırması (bellek + süre)"""
+    rng = np.random.default_rng(0)
+    times = pd.date_range("2025-09-01T00:30:00", periods=steps, freq='h')
+    data = (280 + 10 * rng.standard_normal((steps, MERRA2_LAT.size, MERRA2_LON.size))).astype('float32')
+    lon_360 = np.linspace(0, 359.375, MERRA2_LON.size)
+
+    print(f"{'ızgara':>10} {'yol':>8} {'süre (ms)':>10} {'tepe bellek (MB)':>17}")
+    for name, lon in (('-180..180', MERRA2_LON), ('0..360', lon_360)):
+        da = xr.DataArray(data, dims=('time', 'lat', 'lon'),
+                          coords={'time': times, 'lat': MERRA2_LAT, 'lon': lon}, name='T2M')
+        t_old, m_old, r_old = _measure(_subset_time_space_legacy, da, 0, BBOX, repeat=repeat)
+        t_new, m_new, r_new = _measure(subset_time_space, da, 0, BBOX, repeat=repeat)
+        np.testing.assert_allclose(r_old.values, r_new.values)
+        for bbox in [BBOX] + SUBSET_CHECK_BBOXES:
+            result = subset_time_space(da, 0, bbox)
+            expected = _subset_reference(da, bbox)
+            assert (np.diff(result.lon.values) > 0).all(), f"{name} {bbox}: boylam artan değil"
+            np.testing.assert_array_equal(result.lon.values, expected.lon.values)
+            np.testing.assert_allclose(result.values, expected.values)
+        print(f"{name:>10} {'eski':>8} {t_old * 1000:>10.2f} {m_old:>17.2f}")
+        print(f"{name:>10} {'yeni':>8} {t_new * 1000:>10.2f} {m_new:>17.2f}")
+
+def _drought_index_legacy(field):
+    """Eski kuraklık indeksi: her adımda yeni xarray nesnesi"""
+    clim = float(np.nanmean(field))
+    drought_index = 1.0 - (field / (clim + 1e-9))
+    drought_index = drought_index.clip(min=0.0, max=2.0)
+    return (drought_index - float(drought_index.min())) / (float(drought_index.max()) - float(drought_index.min()) + 1e-9)
+
+def bench_drought(steps, repeat, workers):
+    """Kuraklık indeksi: eski xarray zinciri ile birleşik çekirdeğin karşılaştırması"""
+    rng = np.random.default_rng(0)
+    shape = (steps, MERRA2_LAT.size, MERRA2_LON.size) if steps > 1 else (MERRA2_LAT.size, MERRA2_LON.size)
+    data = rng.uniform(0.05, 0.95, shape).astype('float32')
+    data[..., :10, :] = np.nan  # Deniz/eksik hücreler
+    dims = ('time', 'lat', 'lon') if steps > 1 else ('lat', 'lon')
+    da = xr.DataArray(data, dims=dims)
+    out = np.empty_like(data)
+
+    expected = _drought_index_legacy(da).values
+    np.testing.assert_allclose(drought_index_kernel(data, out=out, workers=workers), expected, rtol=1e-4, atol=1e-5)
+
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        _drought_index_legacy(da)
+    t_old = (time.perf_counter() - t0) / repeat
+
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        drought_index_kernel(data, out=out, workers=workers)
+    t_new = (time.perf_counter() - t0) / repeat
+
+    print(f"ızgara {shape}, {workers} iş parçacığı")
+    print(f"{'eski (xarray)':>16}: {t_old * 1000:8.2f} ms")
+    print(f"{'birleşik çekirdek':>16}: {t_new * 1000:8.2f} ms  ({t_old / t_new:.1f}x)")
+
+def _gemini_legacy_call(base_url, index):
+    """Eski yol: her çağrıda yeni istemci (ve yeni bağlantı)"""
+    from google import genai
+    from google.genai import types
+    client = genai.Client(api_key=os.environ['GEMINI_API_KEY'], http_options=types.HttpOptions(base_url=base_url))
+    contents = [types.Content(role="user", parts=[types.Part.from_text(text=f"benchmark {index}")])]
+    return "".join(chunk.text or "" for chunk in client.models.generate_content_stream(
+        model="gemini-2.0-flash-exp", contents=contents, config=types.GenerateContentConfig()))
+
+def bench_ai(requests, concurrency, first_token_ms, chunk_ms):
+    """Gemini çağrı verimi: çağrı başına istemci / paylaşılan istemci (yerel stub ile)"""
+    import ai_analysis
+    from gemini_stub import start_stub_server
+
+    server, base_url = start_stub_server(first_token_ms=first_token_ms, chunk_ms=chunk_ms)
+    os.environ.setdefault('GEMINI_API_KEY', 'stub')
+    ai_analysis.GEMINI_BASE_URL = base_url
+    ai_analysis.llm_disk_cache = None  # Her istek farklı özet: önbellek devre dışı kalır
+    ai_analysis._gemini_slots = threading.BoundedSemaphore(concurrency)
+
+    def shared_call(index):
+        return "".join(ai_analysis.stream_gemini_analysis({'dates': ['bench', str(index)]}))
+
+    print(f"[BENCH] stub {base_url}: {requests} istek, {concurrency} eşzamanlı, ilk parça {first_token_ms} ms")
+    print(f"{'yol':>10} {'toplam (s)':>11} {'istek/s':>8} {'p50 (ms)':>9} {'p95 (ms)':>9} {'bağlantı':>9}")
+    for name, call in (('eski', lambda i: _gemini_legacy_call(base_url, i)), ('paylaşılan', shared_call)):
+        with server.stats_lock:
+            connections_before = server.stats['connections']
+        latencies = []
+
+        def timed(index):
+            t0 = time.perf_counter()
+            assert call(index)
+            latencies.append(time.perf_counter() - t0)
+
+        t0 = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            list(pool.map(timed, range(requests)))
+        total = time.perf_counter() - t0
+        latencies.sort()
+        p50 = latencies[len(latencies) // 2] * 1000
+        p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] * 1000
+        with server.stats_lock:
+            connections = server.stats['connections'] - connections_before
+        print(f"{name:>10} {total:>11.2f} {requests / total:>8.1f} {p50:>9.1f} {p95:>9.1f} {connections:>9}")
+    server.shutdown()
+
+def make_synthetic_processed(bbox=BBOX):
+    """process_variables çıktısı biçiminde sentetik alanlar (MERRA-2 çözünürlüğünde bbox)"""
+    lon_min, lat_min, lon_max, lat_max = bbox
+    lat = MERRA2_LAT[(MERRA2_LAT >= lat_min) & (MERRA2_LAT <= lat_max)]
+    lon = MERRA2_LON[(MERRA2_LON >= lon_min) & (MERRA2_LON <= lon_max)]
+    rng = np.random.default_rng(0)
+
+    def field(mean, std, name):
+        return xr.DataArray(mean + std * rng.standard_normal((lat.size, lon.size)), dims=('lat', 'lon'),
+                            coords={'lat': lat, 'lon': lon}, name=name)
+
+    return {
+        'temperature_c': field(20, 5, 'T2M'),
+        'precipitation_mm_day': abs(field(0, 3, 'PRECTOT')),
+        'drought_index': field(0.5, 0.15, 'drought_index').clip(0, 1),
+        'u_wind': field(1, 3, 'U10M'),
+        'v_wind': field(1, 3, 'V10M'),
+        'aerosol': abs(field(0.2, 0.05, 'TOTEXTTAU'))
+    }
+
+def bench_render(repeat):
+    """plot_weather_map + create_quick_plot: her çizimde GeoAxes + add_feature / önbellekli basemap yolları"""
+    import plotting_utils
+
+    processed = make_synthetic_processed()
+    dates = ("2025-09-01", "2025-09-02")
+    tmpdir = tempfile.mkdtemp(prefix="bench_render_")
+    try:
+        print(f"{'yol':>10} {'ilk (s)':>9} {'ortalama (s)':>13}")
+        for name, cached in (('eski', False), ('basemap', True)):
+            plotting_utils.BASEMAP_CACHE = cached
+            plotting_utils._basemaps.clear()
+            times = []
+            for i in range(repeat + 1):
+                t0 = time.perf_counter()
+                plotting_utils.plot_weather_map(processed, dates, save_path=os.path.join(tmpdir, f"{name}_map_{i}.png"))
+                plotting_utils.create_quick_plot(processed, dates, save_path=os.path.join(tmpdir, f"{name}_quick_{i}.png"))
+                times.append(time.perf_counter() - t0)
+            print(f"{name:>10} {times[0]:>9.2f} {sum(times[1:]) / max(1, repeat):>13.2f}")
+        print(f"[BENCH] Çıktılar: {tmpdir}")
+    except BaseException:
+        shutil.rmtree(tmpdir, ignore_errors=True)
+        raise
+
+def main():
+    parser = argparse.ArgumentParser(description="NASA Weather Analysis benchmarks")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    p = sub.add_parser('granules', help="Çoklu granül okuma verimi (1..744 granül)")
+    p.add_argument('--counts', type=int, nargs='+', default=[1, 24, 168, 744])
+    p.add_argument('--max-open-files', type=int, default=8)
+
+    p = sub.add_parser('subset', help="subset_time_space eski/yeni bellek ve süre karşılaştırması")
+    p.add_argument('--steps', type=int, default=24)
+    p.add_argument('--repeat', type=int, default=5)
+
+    p = sub.add_parser('drought', help="Kuraklık indeksi mikro-benchmark (MERRA-2 global çözünürlük)")
+    p.add_argument('--steps', type=int, default=1)
+    p.add_argument('--repeat', type=int, default=20)
+    p.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+
+    p = sub.add_parser('ai', help="Gemini istemci verimi ve gecikmesi (yerel stub, gerçek API gerekmez)")
+    p.add_argument('--requests', type=int, default=32)
+    p.add_argument('--concurrency', type=int, default=4)
+    p.add_argument('--first-token-ms', type=float, default=300)
+    p.add_argument('--chunk-ms', type=float, default=20)
+
+    p = sub.add_parser('render', help="Harita çizim süresi: GeoAxes + add_feature her seferinde / önbellekli basemap")
+    p.add_argument('--repeat', type=int, default=5)
+
+    args = parser.parse_args()
+    if args.command == 'granules':
+        bench_granules(args.counts, args.max_open_files)
+    elif args.command == 'subset':
+        bench_subset(args.steps, args.repeat)
+    elif args.command == 'drought':
+        bench_drought(args.steps, args.repeat, args.workers)
+    elif args.command == 'ai':
+        bench_ai(args.requests, args.concurrency, args.first_token_ms, args.chunk_ms)
+    elif args.command == 'render':
+        bench_render(args.repeat)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,256 @@
+# -*- coding: utf-8 -*-
+"""
+Cache Utilities
+Disk ve bellek önbellekleri için yardımcı fonksiyonlar
+"""
+
+import hashlib
+import io
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+def cache_key(*parts):
+    """Parçalardan içerik adresli (sha256) anahtar üret"""
+    h = hashlib.sha256()
+    for p in parts:
+        h.update(str(p).encode('utf-8'))
+        h.update(b'\0')
+    return h.hexdigest()
+
+def atomic_write(path, writer, mode='wb'):
+    """Dosyayı geçici dosyaya yazıp os.replace ile atomik olarak yerine koy"""
+    directory = os.path.dirname(path) or '.'
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.tmp_')
+    try:
+        with os.fdopen(fd, mode) as f:
+            writer(f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+    return path
+
+class DiskLRUCache:
+    """Boyut sınırlı, LRU tahliyeli disk önbelleği (erişim zamanı = mtime)
+
+    Toplam boyut bellekte tutulur (dizin sadece ilk kullanımda ve tahliyede taranır); tahliye
+    sınır aşılınca low_water oranına kadar yapılır. Kiralanan (pin) dosyalar tahliye edilmez.
+    """
+
+    def __init__(self, directory, max_bytes, suffix='', low_water=0.9):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.suffix = suffix
+        self.low_water = low_water
+        self._total = None
+        self._pins = {}  # yol -> kira sayısı
+        self._lock = threading.Lock()
+
+    def path_for(self, key):
+        """Anahtarın disk üzerindeki yolu"""
+        return os.path.join(self.directory, key[:2], key + self.suffix)
+
+    def get(self, key, pin=False):
+        """Önbellekte varsa yolu döndür ve LRU zamanını güncelle (pin=True: tahliyeye karşı kirala)"""
+        path = self.path_for(key)
+        with self._lock:
+            try:
+                os.utime(path, None)
+            except OSError:
+                return None
+            if pin:
+                self._pins[path] = self._pins.get(path, 0) + 1
+        return path
+
+    def put_stream(self, key, fileobj, chunk_size=8 * 1024 * 1024, pin=False):
+        """Dosya benzeri nesneyi atomik olarak önbelleğe yaz (pin=True: tahliyeye karşı kirala)"""
+        path = self.path_for(key)
+        try:
+            old_size = os.path.getsize(path)
+        except OSError:
+            old_size = 0
+        atomic_write(path, lambda f: shutil.copyfileobj(fileobj, f, chunk_size))
+        with self._lock:
+            if pin:
+                self._pins[path] = self._pins.get(path, 0) + 1
+            if self._total is not None:
+                self._total += os.path.getsize(path) - old_size
+        self.evict()
+        return path
+
+    def unpin(self, paths):
+        """get/put_stream ile alınan kiraları bırak"""
+        with self._lock:
+            for path in paths:
+                count = self._pins.get(path, 0) - 1
+                if count > 0:
+                    self._pins[path] = count
+                else:
+                    self._pins.pop(path, None)
+
+    def remove(self, path):
+        """Dosyayı sil ve toplam boyutu güncelle"""
+        with self._lock:
+            try:
+                size = os.path.getsize(path)
+                os.remove(path)
+            except OSError:
+                return
+            if self._total is not None:
+                self._total -= size
+
+    def available_bytes(self):
+        """Kiralı dosyalar dışında kullanılabilir bütçe"""
+        with self._lock:
+            pinned = 0
+            for path in self._pins:
+                try:
+                    pinned += os.path.getsize(path)
+                except OSError:
+                    continue
+            return self.max_bytes - pinned
+
+    def entries(self):
+        """(mtime, boyut, yol) listesi"""
+        items = []
+        if not os.path.isdir(self.directory):
+            return items
+        for root, _, names in os.walk(self.directory):
+            for name in names:
+                if name.startswith('.tmp_'):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                items.append((st.st_mtime, st.st_size, path))
+        return items
+
+    def evict(self):
+        """Toplam boyut sınırı aşılırsa en eski kullanılanları (kiralı olmayan) sil"""
+        with self._lock:
+            if self._total is None:
+                self._total = sum(size for _, size, _ in self.entries())
+            if self._total <= self.max_bytes:
+                return 0
+            items = self.entries()
+            total = sum(size for _, size, _ in items)
+            target = self.max_bytes * self.low_water
+            removed = 0
+            for _, size, path in sorted(items):
+                if total <= target:
+                    break
+                if path in self._pins:
+                    continue
+                try:
+                    os.remove(path)
+                    total -= size
+                    removed += 1
+                except OSError:
+                    continue
+            self._total = total
+            if removed:
+                print(f"[CACHE] {removed} dosya tahliye edildi ({self.directory})")
+            if total > self.max_bytes:
+                print(f"[WARN] Önbellek sınırı kiralı dosyalar yüzünden aşıldı: {total} > {self.max_bytes} bayt ({self.directory})")
+            return removed
+
+class TTLCache:
+    """Bellek içi, süreli (TTL) ve boyut sınırlı LRU önbellek"""
+
+    def __init__(self, max_entries=256, ttl=3600):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, validate=None):
+        """Geçerli değeri döndür, yoksa None (validate False dönerse kayıt silinir)"""
+        with self._lock:
+            item = self._data.get(key)
+            if item is not None and validate is not None and not validate(item[1]):
+                del self._data[key]
+                item = None
+            if item is None or (self.ttl and time.time() - item[0] > self.ttl):
+                if item is not None:
+                    del self._data[key]
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return item[1]
+
+    def set(self, key, value, created=None):
+        """Değeri ekle, sınır aşılırsa en eskiyi çıkar"""
+        with self._lock:
+            self._data[key] = (created or time.time(), value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def update(self, key, func):
+        """Kayıt varsa değerini func(değer) ile değiştir (oluşturma zamanı, dolayısıyla TTL korunur)"""
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return False
+            self._data[key] = (item[0], func(item[1]))
+            return True
+
+    def pop(self, key):
+        """Anahtarı sil"""
+        with self._lock:
+            item = self._data.pop(key, None)
+            return item[1] if item else None
+
+    def stats(self):
+        """İsabet/ıskalama sayaçları"""
+        total = self.hits + self.misses
+        return {
+            'entries': len(self._data),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / total, 3) if total else None
+        }
+
+class JsonDiskCache(DiskLRUCache):
+    """Süreli (TTL) JSON disk önbelleği, her anahtar ayrı dosya; boyut sınırı aşılınca LRU tahliye"""
+
+    def __init__(self, directory, ttl=3600, max_bytes=256 * 1024 ** 2):
+        super().__init__(directory, max_bytes, suffix='.json')
+        self.ttl = ttl
+
+    def get(self, key):
+        """(created, value) döndür; yoksa veya süresi dolmuşsa None"""
+        path = super().get(key)
+        if path is None:
+            return None
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                item = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if self.ttl and time.time() - item.get('created', 0) > self.ttl:
+            self.remove(path)
+            return None
+        return item.get('created'), item.get('value')
+
+    def set(self, key, value, created=None):
+        """Değeri atomik olarak yaz"""
+        item = {'created': created or time.time(), 'value': value}
+        data = json.dumps(item, ensure_ascii=False).encode('utf-8')
+        return self.put_stream(key, io.BytesIO(data))
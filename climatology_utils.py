@@ -0,0 +1,237 @@
+# -*- coding: utf-8 -*-
+"""
+Climatology Utilities
+Önceden hesaplanmış klimatoloji (gün-yıl bazında ortalama/std) deposu
+
+Depo yapısı (CLIMATOLOGY_DIR):
+    meta.json              ızgara ve değişken bilgisi
+    <VAR>_mean.npy         (366, nlat, nlon) float16, np.load(mmap_mode='r') ile açılır
+    <VAR>_std.npy          (366, nlat, nlon) float16
+
+Oluşturma (uzun süren, çevrimdışı iş; veri ay ay çekilip işlenir):
+    python climatology_utils.py build --start 1995-01-01 --end 2024-12-31
+"""
+
+import argparse
+import json
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+import xarray as xr
+
+CLIMATOLOGY_DIR = os.getenv('CLIMATOLOGY_DIR', 'climatology')
+CLIMATOLOGY_DTYPE = np.float16
+DAYS_IN_YEAR = 366
+
+# Değişken -> (kaynak koleksiyon, analiz birimine dönüşüm çarpanı, birim)
+CLIMATOLOGY_VARIABLES = {
+    'GWETROOT': ("M2T1NXLND", 1.0, "1"),
+    'PRECTOT': ("M2T1NXFLX", 86400.0, "mm/day"),
+}
+ANOMALY_CLIP = 3.0  # Kuraklık indeksi = clip(-z, 0, 3) / 3
+
+_store = None
+_store_lock = threading.Lock()
+
+def _grid_meta(da):
+    """Düzenli lat/lon ızgara bilgisi"""
+    lat = da['lat'].values
+    lon = da['lon'].values
+    return {
+        'lat0': float(lat[0]), 'dlat': float(lat[1] - lat[0]), 'nlat': int(lat.size),
+        'lon0': float(lon[0]), 'dlon': float(lon[1] - lon[0]), 'nlon': int(lon.size),
+    }
+
+def month_periods(start, end):
+    """[start, end] aralığını takvim aylarına böl; ('YYYY-MM-DD', 'YYYY-MM-DD') listesi"""
+    start, end = pd.Timestamp(start), pd.Timestamp(end)
+    periods = []
+    for month in pd.date_range(start.to_period('M').to_timestamp(), end, freq='MS'):
+        first = max(month, start)
+        last = min(month + pd.offsets.MonthEnd(0), end)
+        periods.append((f"{first:%Y-%m-%d}", f"{last:%Y-%m-%d}"))
+    return periods
+
+def build_climatology(open_dataset, periods, out_dir=CLIMATOLOGY_DIR, subset=None):
+    """Gün-yıl klimatolojisini dönem dönem (örn. aylık) akıtarak üret
+
+    open_dataset(short_name, start, end) -> xr.Dataset veya None; her dönem tek compute ile günlük
+    ortalamaya indirilir, veri seti kapatılır. Gün-yıl başına sayı/toplam/kare toplamı diskte (memmap)
+    biriktirilir, sonda ortalama/std yazılır. subset(da) verilirse (örn. bbox) dönem verisine uygulanır.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    meta = {'variables': {}}
+    for var, (short_name, factor, units) in CLIMATOLOGY_VARIABLES.items():
+        acc = None
+        years = set()
+        for start, end in periods:
+            ds = open_dataset(short_name, start, end)
+            if ds is None:
+                continue
+            try:
+                if var not in ds.variables:
+                    print(f"[WARN] {var} bulunamadı ({start}..{end}), atlanıyor")
+                    continue
+                da = ds[var].sel(time=slice(start, end))  # Dönem sınırındaki granüller iki kez sayılmasın
+                if subset is not None:
+                    da = subset(da)
+                daily = (da * factor).resample(time='1D').mean()
+                values = np.asarray(daily.values, dtype=np.float64)
+                doy = daily['time'].dt.dayofyear.values
+                if acc is None:
+                    if not meta.get('grid'):
+                        meta['grid'] = _grid_meta(da)
+                    grid = meta['grid']
+                    shape = (DAYS_IN_YEAR, grid['nlat'], grid['nlon'])
+                    acc = {name: np.lib.format.open_memmap(os.path.join(out_dir, f".{var}_{name}.npy"), mode='w+',
+                                                           dtype=dtype, shape=shape)
+                           for name, dtype in (('count', np.int32), ('sum', np.float64), ('sumsq', np.float64))}
+                for i, d in enumerate(doy):
+                    v = values[i]
+                    finite = np.isfinite(v)
+                    v = np.where(finite, v, 0.0)
+                    acc['count'][d - 1] += finite
+                    acc['sum'][d - 1] += v
+                    acc['sumsq'][d - 1] += v * v
+                years.update(int(y) for y in daily['time'].dt.year.values)
+            finally:
+                ds.close()
+            print(f"[INFO] Klimatoloji {var}: {start}..{end} eklendi")
+        if acc is None:
+            print(f"[WARN] {var} için veri yok, atlanıyor")
+            continue
+
+        grid = meta['grid']
+        shape = (DAYS_IN_YEAR, grid['nlat'], grid['nlon'])
+        mean_out = np.lib.format.open_memmap(os.path.join(out_dir, f"{var}_mean.npy"), mode='w+',
+                                             dtype=CLIMATOLOGY_DTYPE, shape=shape)
+        std_out = np.lib.format.open_memmap(os.path.join(out_dir, f"{var}_std.npy"), mode='w+',
+                                            dtype=CLIMATOLOGY_DTYPE, shape=shape)
+        for d in range(DAYS_IN_YEAR):
+            count = acc['count'][d]
+            with np.errstate(invalid='ignore', divide='ignore'):
+                mean = np.where(count > 0, acc['sum'][d] / count, np.nan)
+                var_d = np.maximum(acc['sumsq'][d] / count - mean * mean, 0.0)
+            mean_out[d] = mean
+            std_out[d] = np.where(count > 0, np.sqrt(var_d), np.nan)
+        mean_out.flush()
+        std_out.flush()
+        paths = [arr.filename for arr in acc.values()]
+        acc = count = None
+        for path in paths:
+            os.remove(path)
+        years = sorted(years)
+        meta['variables'][var] = {'units': units, 'years': [years[0], years[-1]] if years else None}
+        print(f"[DONE] Klimatoloji yazıldı: {var} ({len(years)} yıl)")
+
+    with open(os.path.join(out_dir, 'meta.json'), 'w', encoding='utf-8') as f:
+        json.dump(meta, f, indent=2)
+    reset_climatology()
+    return meta
+
+def reset_climatology():
+    """Yüklü depoyu unut (yeniden oluşturma sonrası)"""
+    global _store
+    with _store_lock:
+        _store = None
+
+def load_climatology(directory=CLIMATOLOGY_DIR):
+    """Depoyu bir kez, bellek eşlemeli olarak yükle; yoksa None"""
+    global _store
+    with _store_lock:
+        if _store is not None:
+            return _store or None
+        store = {}
+        try:
+            with open(os.path.join(directory, 'meta.json'), 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+            for var in meta.get('variables', {}):
+                store[var] = (np.load(os.path.join(directory, f"{var}_mean.npy"), mmap_mode='r'),
+                              np.load(os.path.join(directory, f"{var}_std.npy"), mmap_mode='r'))
+            store['_grid'] = meta['grid']
+            print(f"[INFO] Klimatoloji yüklendi: {[v for v in store if v != '_grid']}")
+        except (OSError, ValueError, KeyError):
+            store = {}
+        _store = store
+        return _store or None
+
+def has_climatology(var):
+    """Değişken için klimatoloji var mı"""
+    store = load_climatology()
+    return store is not None and var in store
+
+def _grid_indices(grid, lat, lon):
+    """Hücre koordinatlarından depo indeksleri (düzenli ızgarada O(1)); (iy, ix, geçerli satır, geçerli sütun)
+
+    Boylam sadece küresel depoda (nlon * dlon ≈ 360) sarılır; bbox deposunda kapsam dışı sütunlar geçersizdir.
+    """
+    iy = np.rint((np.asarray(lat) - grid['lat0']) / grid['dlat']).astype(int)
+    ix = np.rint(((np.asarray(lon) - grid['lon0']) % 360) / grid['dlon']).astype(int)
+    valid_y = (iy >= 0) & (iy < grid['nlat'])
+    if abs(grid['nlon'] * grid['dlon'] - 360.0) < abs(grid['dlon']) / 2:
+        ix %= grid['nlon']
+        valid_x = np.ones(ix.shape, dtype=bool)
+    else:
+        valid_x = (ix >= 0) & (ix < grid['nlon'])
+    return np.clip(iy, 0, grid['nlat'] - 1), np.clip(ix, 0, grid['nlon'] - 1), valid_y, valid_x
+
+def climatology_anomaly(field, var, days_of_year, require_coverage=False):
+    """Alanın klimatolojiye göre standart anomalisi (z); dönem için gün-yıl ortalaması kullanılır
+
+    Depo dışında kalan hücreler NaN; require_coverage=True ise alan tamamen kapsanmadığında None.
+    """
+    store = load_climatology()
+    if store is None or var not in store:
+        return None
+    mean_arr, std_arr = store[var]
+    iy, ix, valid_y, valid_x = _grid_indices(store['_grid'], field['lat'].values, field['lon'].values)
+    if require_coverage and not (valid_y.all() and valid_x.all()):
+        print(f"[WARN] Klimatoloji deposu alanı kapsamıyor ({var}), göreli indeks kullanılacak")
+        return None
+    rows, cols = np.ix_(iy, ix)
+
+    days = sorted(set(int(d) for d in np.atleast_1d(days_of_year)))
+    clim_mean = np.zeros((iy.size, ix.size), dtype=np.float64)
+    clim_std = np.zeros_like(clim_mean)
+    for d in days:
+        clim_mean += mean_arr[d - 1][rows, cols]
+        clim_std += std_arr[d - 1][rows, cols]
+    clim_mean /= len(days)
+    clim_std /= len(days)
+    clim_std[~valid_y, :] = np.nan
+    clim_std[:, ~valid_x] = np.nan
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        z = (np.asarray(field.values, dtype=np.float64) - clim_mean) / np.maximum(clim_std, 1e-6)
+    return xr.DataArray(z, coords=field.coords, dims=field.dims, name=f"{var}_anomaly")
+
+def climatology_drought_index(field, var, days_of_year):
+    """Klimatoloji anomalisinden 0..1 kuraklık indeksi (1 = 3σ kuru); depo yoksa None"""
+    z = climatology_anomaly(field, var, days_of_year, require_coverage=True)
+    if z is None:
+        return None
+    return (-z).clip(min=0.0, max=ANOMALY_CLIP) / ANOMALY_CLIP
+
+def main():
+    """Klimatoloji deposunu EarthAccess verisinden oluştur"""
+    from weather_utils import BBOX, login_earthaccess, search_and_open, subset_time_space
+
+    parser = argparse.ArgumentParser(description="GWETROOT/PRECTOT gün-yıl klimatolojisi oluştur")
+    sub = parser.add_subparsers(dest='command', required=True)
+    p = sub.add_parser('build')
+    p.add_argument('--start', required=True)
+    p.add_argument('--end', required=True)
+    p.add_argument('--global', dest='global_grid', action='store_true', help="Bbox yerine tüm dünya")
+    p.add_argument('--out', default=CLIMATOLOGY_DIR)
+    args = parser.parse_args()
+
+    if not login_earthaccess():
+        return
+    subset = None if args.global_grid else (lambda da: subset_time_space(da, None, BBOX))
+    build_climatology(lambda short_name, start, end: search_and_open(short_name, dates=(start, end), fail_on_empty=False),
+                      month_periods(args.start, args.end), args.out, subset=subset)
+
+if __name__ == "__main__":
+    main()
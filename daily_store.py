@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+"""
+Daily Store
+Gün başına işlenmiş alan istatistikleri için sıkıştırılmış NetCDF deposu
+
+Anahtar: koleksiyon / bbox / gün; dosya içinde değişken başına dizi grupları (<değişken>_count, _sum ...).
+Çakışan tarih aralıklı analizler depodaki günleri okur, sadece eksik günleri çeker.
+"""
+
+import os
+import threading
+import uuid
+
+import xarray as xr
+
+from cache_utils import cache_key
+
+DAILY_STORE = os.getenv('DAILY_STORE', '1') != '0'  # '0' = her analizde tüm aralık yeniden çekilir
+DAILY_STORE_DIR = os.getenv('DAILY_STORE_DIR', os.path.join('output', 'daily_store'))
+DAILY_STORE_COMPLEVEL = int(os.getenv('DAILY_STORE_COMPLEVEL', '4'))
+# netCDF4/HDF5 iş parçacığı güvenli değil: koleksiyonlar paralel işlenirken dosya G/Ç sırayla
+_io_lock = threading.Lock()
+
+class DailyStore:
+    """(koleksiyon, bbox, gün) başına bir NetCDF dosyası (zlib sıkıştırmalı, parçalı)"""
+
+    def __init__(self, directory=DAILY_STORE_DIR, version='', complevel=DAILY_STORE_COMPLEVEL):
+        self.directory = directory
+        self.version = version  # Biçim/histogram aralığı değişince eski günler kullanılmaz
+        self.complevel = complevel
+
+    def path_for(self, short_name, bbox, day):
+        """Günün dosya yolu"""
+        bbox_key = cache_key(self.version, *(round(float(v), 4) for v in bbox))[:16]
+        return os.path.join(self.directory, short_name, bbox_key, f"{day:%Y-%m-%d}.nc")
+
+    def load(self, short_name, bbox, day):
+        """Günün veri setini belleğe yükle; yoksa veya okunamazsa None"""
+        path = self.path_for(short_name, bbox, day)
+        if not os.path.exists(path):
+            return None
+        try:
+            with _io_lock, xr.open_dataset(path, engine='netcdf4') as ds:
+                return ds.load()
+        except (OSError, ValueError) as e:
+            print(f"[WARN] Günlük depo okunamadı ({path}): {e}")
+            return None
+
+    def save(self, short_name, bbox, day, ds):
+        """Veri setini geçici dosyaya yazıp atomik olarak yerine koy"""
+        path = self.path_for(short_name, bbox, day)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = os.path.join(os.path.dirname(path), f".tmp_{uuid.uuid4().hex}.nc")
+        encoding = {name: {'zlib': True, 'complevel': self.complevel} for name in ds.data_vars}
+        try:
+            with _io_lock:
+                ds.to_netcdf(tmp_path, engine='netcdf4', encoding=encoding)
+            os.replace(tmp_path, path)
+        except BaseException:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            raise
+        return path
@@ -0,0 +1,144 @@
+# -*- coding: utf-8 -*-
+"""
+Field Store
+İşlenmiş 2B alanların analiz başına saklanması (output/fields/, boyut sınırlı LRU)
+
+Karo (tile) ve ikili alan uçları PNG yerine bu ham ızgaralardan tembel olarak üretilir.
+"""
+
+import gzip
+import io
+import os
+import re
+
+import numpy as np
+
+from cache_utils import DiskLRUCache, TTLCache
+
+FIELD_STORE_DIR = os.getenv('FIELD_STORE_DIR', os.path.join('output', 'fields'))
+FIELD_STORE_MAX_BYTES = int(float(os.getenv('FIELD_STORE_MAX_MB', '1024')) * 1024 ** 2)
+FIELD_CACHE_MAX_ENTRIES = int(os.getenv('FIELD_CACHE_MAX_ENTRIES', '8'))
+STORED_FIELDS = ('temperature_c', 'precipitation_mm_day', 'drought_index', 'aerosol',
+                 'u_wind', 'v_wind', 'wind_speed')
+_ANALYSIS_ID_RE = re.compile(r'[A-Za-z0-9_\-]+')
+# İkili alan kodlamaları: uint8 = doğrusal nicemleme (değer = q * scale + offset), 255 = veri yok
+FIELD_ENCODINGS = ('uint8', 'float16', 'float32')
+UINT8_NODATA = 255
+FIELD_ALIASES = {'wind': 'wind_speed', 'temperature': 'temperature_c', 'precipitation': 'precipitation_mm_day',
+                 'drought': 'drought_index', 'aod': 'aerosol'}
+
+# Analiz alanları diskte LRU, boyut sınırlı (en eski kullanılan analizlerin alanları silinir)
+field_cache = DiskLRUCache(FIELD_STORE_DIR, FIELD_STORE_MAX_BYTES, suffix='.npz')
+# Son açılan alanlar bellekte (karo istekleri aynı analiz için art arda gelir)
+_loaded = TTLCache(max_entries=FIELD_CACHE_MAX_ENTRIES, ttl=0)
+# Kodlanmış gövdeler (aralık istekleri aynı gövdeyi parça parça ister)
+_encoded = TTLCache(max_entries=FIELD_CACHE_MAX_ENTRIES * len(STORED_FIELDS), ttl=0)
+
+def field_path(analysis_id):
+    """Analizin alan dosyası; geçersiz kimlikte None (yol enjeksiyonuna karşı)"""
+    if not analysis_id or not _ANALYSIS_ID_RE.fullmatch(analysis_id):
+        return None
+    return field_cache.path_for(analysis_id)
+
+def save_fields(analysis_id, processed_data, bbox):
+    """(lat, lon) ızgarasındaki alanları float32 olarak sıkıştırılmış npz'ye yaz"""
+    path = field_path(analysis_id)
+    if path is None:
+        return None
+    arrays = {}
+    for key in STORED_FIELDS:
+        da = processed_data.get(key)
+        if da is None or da.dims != ('lat', 'lon'):
+            continue
+        if 'lat' not in arrays:
+            arrays['lat'] = np.asarray(da['lat'].values, dtype=np.float64)
+            arrays['lon'] = np.asarray(da['lon'].values, dtype=np.float64)
+        arrays[key] = np.asarray(da.values, dtype=np.float32)
+    if 'lat' not in arrays:
+        print(f"[WARN] Saklanacak 2B alan yok: {analysis_id}")
+        return None
+    arrays['bbox'] = np.asarray(bbox, dtype=np.float64)
+    buf = io.BytesIO()
+    np.savez_compressed(buf, **arrays)
+    buf.seek(0)
+    field_cache.put_stream(analysis_id, buf)
+    _loaded.pop(analysis_id)
+    for encoding in FIELD_ENCODINGS:
+        for key in STORED_FIELDS:
+            _encoded.pop((analysis_id, key, encoding))
+    return path
+
+def load_fields(analysis_id):
+    """{'lat', 'lon', 'bbox', alan: dizi, ...} döndür; yoksa None"""
+    fields = _loaded.get(analysis_id)
+    if fields is not None:
+        return fields
+    if field_path(analysis_id) is None:
+        return None
+    path = field_cache.get(analysis_id)  # LRU zamanını da günceller
+    if path is None:
+        return None
+    try:
+        with np.load(path) as data:
+            fields = {name: data[name] for name in data.files}
+    except OSError:  # Bu arada tahliye edildi
+        return None
+    _loaded.set(analysis_id, fields)
+    return fields
+
+def field_metadata(analysis_id, fields):
+    """Izgara eksenleri ve alan başına boyut/aralık bilgisi (ikili gövdeleri çözmek için)"""
+    info = {}
+    for key in STORED_FIELDS:
+        values = fields.get(key)
+        if values is None:
+            continue
+        finite = values[np.isfinite(values)]
+        info[key] = {
+            'shape': list(values.shape),
+            'min': float(finite.min()) if finite.size else None,
+            'max': float(finite.max()) if finite.size else None
+        }
+    return {
+        'analysis_id': analysis_id,
+        'dims': ['lat', 'lon'],
+        'order': 'C',
+        'byte_order': 'little',
+        'lat': fields['lat'].tolist(),
+        'lon': fields['lon'].tolist(),
+        'bbox': fields['bbox'].tolist(),
+        'encodings': list(FIELD_ENCODINGS),
+        'uint8_nodata': UINT8_NODATA,
+        'fields': info
+    }
+
+def encode_field(values, encoding):
+    """Alanı satır öncelikli, little-endian ikili gövdeye çevir; (bayt, {shape, dtype, scale, offset, nodata})"""
+    if encoding == 'uint8':
+        finite = np.isfinite(values)
+        lo = float(values[finite].min()) if finite.any() else 0.0
+        hi = float(values[finite].max()) if finite.any() else 0.0
+        scale = (hi - lo) / (UINT8_NODATA - 1) or 1.0
+        q = np.full(values.shape, UINT8_NODATA, dtype=np.uint8)
+        q[finite] = np.rint((values[finite] - lo) / scale).astype(np.uint8)
+        return q.tobytes(), {'shape': values.shape, 'dtype': 'uint8', 'scale': scale, 'offset': lo,
+                             'nodata': UINT8_NODATA}
+    dtype = np.dtype(encoding).newbyteorder('<')
+    return values.astype(dtype).tobytes(), {'shape': values.shape, 'dtype': encoding, 'scale': 1.0,
+                                            'offset': 0.0, 'nodata': 'NaN'}
+
+def get_encoded_field(analysis_id, fields, name, encoding):
+    """(ham gövde, gzip gövde, kodlama bilgisi); alan yoksa None"""
+    name = FIELD_ALIASES.get(name, name)
+    if name not in STORED_FIELDS:  # lat/lon/bbox eksen dizileri alan değil
+        return None
+    key = (analysis_id, name, encoding)
+    item = _encoded.get(key)
+    if item is None:
+        values = fields.get(name)
+        if values is None:
+            return None
+        data, info = encode_field(values, encoding)
+        item = (data, gzip.compress(data, compresslevel=6), info)
+        _encoded.set(key, item)
+    return item
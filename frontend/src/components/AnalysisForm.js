@@ -29,33 +29,66 @@ export default function AnalysisForm({
     });
   }, []);
 
-  // Track analysis progress
+  // Track analysis progress: prefer push updates (SSE), fall back to polling if unavailable
   useEffect(() => {
-    if (currentAnalysis) {
-      const interval = setInterval(async () => {
+    if (!currentAnalysis) return;
+    let source = null;
+    let interval = null;
+    const job = {};
+
+    // Returns true once the job reached a terminal status
+    const handleUpdate = (data) => {
+      setProgress(data.progress);
+      setProgressMessage(data.message);
+
+      if (data.status === 'completed') {
+        onAnalysisComplete(data.result);
+        return true;
+      } else if (data.status === 'error' || data.status === 'cancelled') {
+        setProgressMessage(data.status === 'cancelled' ? 'Analysis cancelled' : 'Analysis failed');
+        return true;
+      }
+      return false;
+    };
+
+    const startPolling = () => {
+      interval = setInterval(async () => {
         try {
           const response = await fetch(`${apiBase}/progress/${currentAnalysis}`);
           const data = await response.json();
           
-          if (data.success) {
-            setProgress(data.data.progress);
-            setProgressMessage(data.data.message);
-            
-            if (data.data.status === 'completed') {
-              onAnalysisComplete(data.data.result);
-              clearInterval(interval);
-            } else if (data.data.status === 'error') {
-              setProgressMessage('Analysis failed');
-              clearInterval(interval);
-            }
+          if (data.success && handleUpdate(data.data)) {
+            clearInterval(interval);
           }
         } catch (error) {
           console.error('Progress tracking error:', error);
         }
       }, 2000);
+    };
 
-      return () => clearInterval(interval);
+    if (typeof window !== 'undefined' && window.EventSource) {
+      source = new EventSource(`${apiBase}/progress/${currentAnalysis}/stream`);
+      source.onmessage = (event) => {
+        Object.assign(job, JSON.parse(event.data));
+        if (handleUpdate(job)) {
+          source.close();
+        }
+      };
+      source.addEventListener('end', () => source.close());
+      source.onerror = () => {
+        source.close();
+        if (job.status !== 'completed' && job.status !== 'error' && job.status !== 'cancelled') {
+          startPolling();
+        }
+      };
+    } else {
+      startPolling();
     }
+
+    return () => {
+      if (source) source.close();
+      if (interval) clearInterval(interval);
+    };
   }, [currentAnalysis, apiBase, onAnalysisComplete]);
 
   const handleSubmit = (e) => {
@@ -39,36 +39,69 @@ export default function AnalysisPage() {
     });
   }, []);
 
-  // Track analysis progress
+  // Track analysis progress: prefer push updates (SSE), fall back to polling if unavailable
   useEffect(() => {
-    if (currentAnalysis) {
-      const interval = setInterval(async () => {
+    if (!currentAnalysis) return;
+    let source = null;
+    let interval = null;
+    const job = {};
+
+    // Returns true once the job reached a terminal status
+    const handleUpdate = (data) => {
+      setProgress(data.progress);
+      setProgressMessage(data.message);
+
+      if (data.status === 'completed') {
+        // Store results and navigate to results page
+        localStorage.setItem('analysis_results', JSON.stringify(data.result));
+        router.push('/results');
+        return true;
+      } else if (data.status === 'error' || data.status === 'cancelled') {
+        setProgressMessage(data.status === 'cancelled' ? 'Analysis cancelled' : 'Analysis failed');
+        setIsAnalyzing(false);
+        return true;
+      }
+      return false;
+    };
+
+    const startPolling = () => {
+      interval = setInterval(async () => {
         try {
           const response = await fetch(`${API_BASE}/progress/${currentAnalysis}`);
           const data = await response.json();
           
-          if (data.success) {
-            setProgress(data.data.progress);
-            setProgressMessage(data.data.message);
-            
-            if (data.data.status === 'completed') {
-              // Store results and navigate to results page
-              localStorage.setItem('analysis_results', JSON.stringify(data.data.result));
-              router.push('/results');
-              clearInterval(interval);
-            } else if (data.data.status === 'error') {
-              setProgressMessage('Analysis failed');
-              setIsAnalyzing(false);
-              clearInterval(interval);
-            }
+          if (data.success && handleUpdate(data.data)) {
+            clearInterval(interval);
           }
         } catch (error) {
           console.error('Progress tracking error:', error);
         }
       }, 2000);
+    };
 
-      return () => clearInterval(interval);
+    if (typeof window !== 'undefined' && window.EventSource) {
+      source = new EventSource(`${API_BASE}/progress/${currentAnalysis}/stream`);
+      source.onmessage = (event) => {
+        Object.assign(job, JSON.parse(event.data));
+        if (handleUpdate(job)) {
+          source.close();
+        }
+      };
+      source.addEventListener('end', () => source.close());
+      source.onerror = () => {
+        source.close();
+        if (job.status !== 'completed' && job.status !== 'error' && job.status !== 'cancelled') {
+          startPolling();
+        }
+      };
+    } else {
+      startPolling();
     }
+
+    return () => {
+      if (source) source.close();
+      if (interval) clearInterval(interval);
+    };
   }, [currentAnalysis, router]);
 
   const handleInputChange = (e) => {
@@ -174,7 +174,39 @@ export default function PersonalizedPredictionPage() {
     }
   };
 
-  const pollProgress = async (analysisId) => {
+  const pollProgress = (analysisId) => {
+    // Prefer push updates (SSE); fall back to polling if unavailable
+    if (typeof window !== 'undefined' && window.EventSource) {
+      const job = {};
+      const source = new EventSource(`${API_BASE}/prediction-progress/${analysisId}/stream`);
+      source.onmessage = (event) => {
+        Object.assign(job, JSON.parse(event.data));
+        setProgress(job.progress);
+
+        if (job.status === 'completed') {
+          setPredictions(job.result);
+          setIsGenerating(false);
+          setStep(3);
+          source.close();
+        } else if (job.status === 'error' || job.status === 'cancelled') {
+          setIsGenerating(false);
+          alert('Prediction failed');
+          source.close();
+        }
+      };
+      source.addEventListener('end', () => source.close());
+      source.onerror = () => {
+        source.close();
+        if (job.status !== 'completed' && job.status !== 'error' && job.status !== 'cancelled') {
+          pollProgressInterval(analysisId);
+        }
+      };
+      return;
+    }
+    pollProgressInterval(analysisId);
+  };
+
+  const pollProgressInterval = (analysisId) => {
     const interval = setInterval(async () => {
       try {
         const response = await fetch(`${API_BASE}/prediction-progress/${analysisId}`);
@@ -188,7 +220,7 @@ export default function PersonalizedPredictionPage() {
             setIsGenerating(false);
             setStep(3);
             clearInterval(interval);
-          } else if (data.data.status === 'error') {
+          } else if (data.data.status === 'error' || data.data.status === 'cancelled') {
             setIsGenerating(false);
             alert('Prediction failed');
             clearInterval(interval);
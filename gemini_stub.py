@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Gemini Stub
+Gemini API ile uyumlu yerel sahte uç nokta (benchmark ve çevrimdışı geliştirme için)
+
+Kullanım:
+    python gemini_stub.py --port 8765 --first-token-ms 300 --chunk-ms 20
+    export GEMINI_BASE_URL=http://127.0.0.1:8765 GEMINI_API_KEY=stub
+"""
+
+import argparse
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+STUB_RESPONSE = json.dumps({
+    "ozet": "Bölgede sıcaklıklar mevsim normallerinde, yağış sınırlı. Kuraklık riski orta düzeyde. Rüzgar hafif.",
+    "riskler": {
+        "tarim": "Toprak nemi düşük, sulama planlanmalı.",
+        "saglik": "Öğle saatlerinde sıcak çarpmasına dikkat.",
+        "ulasim": "Önemli bir risk beklenmiyor."
+    },
+    "oneriler": ["Sulamayı sabah saatlerine kaydırın.", "Bol su tüketin.", "Hava durumunu takip edin."]
+}, ensure_ascii=False)
+
+def stub_response(prompt):
+    """Paketlenmiş prompt ("Veri 0:", "Veri 1:" ...) için JSON dizisi, değilse tek analiz"""
+    count = len(set(re.findall(r'Veri (\d+):', prompt)))
+    if count == 0:
+        return STUB_RESPONSE
+    item = json.loads(STUB_RESPONSE)
+    return json.dumps([dict(item, id=i) for i in range(count)], ensure_ascii=False)
+
+class GeminiStubHandler(BaseHTTPRequestHandler):
+    """models/<model>:generateContent ve :streamGenerateContent uçları"""
+
+    protocol_version = 'HTTP/1.1'  # keep-alive
+
+    def setup(self):
+        super().setup()
+        with self.server.stats_lock:
+            self.server.stats['connections'] += 1
+
+    def log_message(self, format, *args):
+        pass
+
+    def _payload(self, text, final, total_chars):
+        payload = {"candidates": [{"content": {"role": "model", "parts": [{"text": text}]}, "index": 0}]}
+        if final:
+            payload["candidates"][0]["finishReason"] = "STOP"
+            payload["usageMetadata"] = {"promptTokenCount": self.prompt_tokens,
+                                        "candidatesTokenCount": total_chars // 4,
+                                        "totalTokenCount": self.prompt_tokens + total_chars // 4}
+        return payload
+
+    def _write_chunk(self, data):
+        self.wfile.write(f"{len(data):x}\r\n".encode('ascii') + data + b"\r\n")
+        self.wfile.flush()
+
+    def do_GET(self):
+        if self.path.rstrip('/') != '/stats':
+            self.send_error(404)
+            return
+        with self.server.stats_lock:
+            body = json.dumps(self.server.stats).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length) if length else b''
+        self.prompt_tokens = len(body) // 4
+        response = stub_response(body.decode('utf-8', 'replace'))
+        with self.server.stats_lock:
+            self.server.stats['requests'] += 1
+
+        time.sleep(self.server.first_token_ms / 1000)
+        if ':streamGenerateContent' in self.path:
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/event-stream')
+            self.send_header('Transfer-Encoding', 'chunked')
+            self.end_headers()
+            size = max(1, len(response) // self.server.chunks)
+            pieces = [response[i:i + size] for i in range(0, len(response), size)]
+            for i, piece in enumerate(pieces):
+                if i:
+                    time.sleep(self.server.chunk_ms / 1000)
+                event = json.dumps(self._payload(piece, i == len(pieces) - 1, len(response)), ensure_ascii=False)
+                self._write_chunk(f"data: {event}\r\n\r\n".encode('utf-8'))
+            self._write_chunk(b"")
+        elif ':generateContent' in self.path:
+            data = json.dumps(self._payload(response, True, len(response)), ensure_ascii=False).encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+        else:
+            self.send_error(404)
+
+def start_stub_server(host='127.0.0.1', port=0, first_token_ms=300, chunk_ms=20, chunks=8):
+    """Stub sunucuyu arka plan iş parçacığında başlat; (sunucu, base_url)"""
+    server = ThreadingHTTPServer((host, port), GeminiStubHandler)
+    server.daemon_threads = True
+    server.first_token_ms = first_token_ms
+    server.chunk_ms = chunk_ms
+    server.chunks = chunks
+    server.stats_lock = threading.Lock()
+    server.stats = {'connections': 0, 'requests': 0}
+    threading.Thread(target=server.serve_forever, name="gemini-stub", daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}"
+
+def main():
+    parser = argparse.ArgumentParser(description="Yerel Gemini API stub")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--first-token-ms', type=float, default=300)
+    parser.add_argument('--chunk-ms', type=float, default=20)
+    parser.add_argument('--chunks', type=int, default=8)
+    args = parser.parse_args()
+
+    server, url = start_stub_server(args.host, args.port, args.first_token_ms, args.chunk_ms, args.chunks)
+    print(f"[INFO] Gemini stub: {url} (GEMINI_BASE_URL={url})")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+"""
+History Index
+Tamamlanan analizler için artımlı SQLite indeksi (/api/history dosyaları tek tek okumaz)
+"""
+
+import json
+import os
+import sqlite3
+import threading
+
+HISTORY_DB_PATH = os.getenv('HISTORY_DB_PATH', os.path.join('output', 'history.sqlite3'))
+
+class HistoryIndex:
+    """analysis_*.json sonuçlarının indeksi"""
+
+    def __init__(self, db_path=HISTORY_DB_PATH, output_dir='output'):
+        self.output_dir = output_dir
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(db_path) or '.', exist_ok=True)
+        self._db = sqlite3.connect(db_path, check_same_thread=False)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute('''CREATE TABLE IF NOT EXISTS analyses (
+            filename TEXT PRIMARY KEY, start_date TEXT, end_date TEXT, created REAL)''')
+        self._db.execute('CREATE INDEX IF NOT EXISTS idx_analyses_created ON analyses (created)')
+        self._db.execute('CREATE INDEX IF NOT EXISTS idx_analyses_dates ON analyses (start_date, end_date)')
+        self._db.execute('CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)')
+        self._db.commit()
+        self._backfill()
+
+    def _backfill(self):
+        """İlk açılışta mevcut sonuç dosyalarını bir kez indeksle"""
+        if self._db.execute("SELECT 1 FROM meta WHERE key = 'backfilled'").fetchone():
+            return
+        count = 0
+        if os.path.exists(self.output_dir):
+            for filename in os.listdir(self.output_dir):
+                if filename.startswith('analysis_') and filename.endswith('.json'):
+                    filepath = os.path.join(self.output_dir, filename)
+                    try:
+                        with open(filepath, 'r', encoding='utf-8') as f:
+                            dates = json.load(f).get('dates') or (None, None)
+                        self.add(filename, dates, os.path.getctime(filepath), commit=False)
+                        count += 1
+                    except (OSError, ValueError, AttributeError):
+                        continue
+        with self._lock:
+            self._db.execute("INSERT OR REPLACE INTO meta VALUES ('backfilled', '1')")
+            self._db.commit()
+        print(f"[INFO] History index: {count} mevcut analiz indekslendi")
+
+    def add(self, filename, dates, created, commit=True):
+        """Tamamlanan analizi indekse ekle"""
+        start_date, end_date = (list(dates) + [None, None])[:2]
+        with self._lock:
+            self._db.execute('INSERT OR REPLACE INTO analyses VALUES (?, ?, ?, ?)',
+                             (filename, start_date, end_date, created))
+            if commit:
+                self._db.commit()
+
+    def query(self, start=None, end=None, since=None, until=None, limit=50, offset=0):
+        """Filtreli, sayfalı liste (en yeni önce); (kayıtlar, toplam)"""
+        where, params = [], []
+        if start:  # Analiz dönemi [start, end] ile kesişenler
+            where.append('end_date >= ?')
+            params.append(start)
+        if end:
+            where.append('start_date <= ?')
+            params.append(end)
+        if since is not None:
+            where.append('created >= ?')
+            params.append(since)
+        if until is not None:
+            where.append('created <= ?')
+            params.append(until)
+        clause = f"WHERE {' AND '.join(where)}" if where else ''
+        with self._lock:
+            total = self._db.execute(f'SELECT COUNT(*) FROM analyses {clause}', params).fetchone()[0]
+            rows = self._db.execute(
+                f'SELECT filename, start_date, end_date, created FROM analyses {clause} '
+                'ORDER BY created DESC LIMIT ? OFFSET ?', params + [limit, offset]).fetchall()
+        return [{
+            'filename': filename,
+            'dates': [start_date, end_date],
+            'created': created,
+            'url': f'/api/files/{filename}'
+        } for filename, start_date, end_date, created in rows], total
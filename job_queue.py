@@ -0,0 +1,118 @@
+# -*- coding: utf-8 -*-
+"""
+Job Queue
+Sınırlı işçi havuzu, kuyruk derinliği sınırı ve iş iptali
+"""
+
+import os
+import queue
+import threading
+import time
+
+JOB_WORKERS = int(os.getenv('JOB_WORKERS', '2'))
+JOB_MAX_QUEUE = int(os.getenv('JOB_MAX_QUEUE', '16'))
+
+class JobCancelled(Exception):
+    """İş kullanıcı tarafından iptal edildi"""
+
+class JobQueue:
+    """Sabit sayıda işçi iş parçacığı ve sınırlı bekleme kuyruğu"""
+
+    def __init__(self, workers=JOB_WORKERS, max_queue=JOB_MAX_QUEUE):
+        self.workers = max(1, workers)
+        self.max_queue = max(1, max_queue)
+        self._queue = queue.Queue(maxsize=self.max_queue)
+        self._lock = threading.Lock()
+        self._cancel_events = {}
+        self._active = set()
+        self._threads = []
+        self._counters = {'submitted': 0, 'rejected': 0, 'completed': 0, 'failed': 0, 'cancelled': 0}
+        self._wait_total = 0.0
+        self._started = 0
+
+    def _ensure_workers(self):
+        """İşçileri ilk kullanımda başlat"""
+        with self._lock:
+            if self._threads:
+                return
+            for i in range(self.workers):
+                t = threading.Thread(target=self._worker, name=f"job-worker-{i}", daemon=True)
+                t.start()
+                self._threads.append(t)
+
+    def submit(self, job_id, func, *args):
+        """İşi kuyruğa ekle; kuyruk doluysa False (geri basınç)"""
+        self._ensure_workers()
+        with self._lock:
+            self._cancel_events[job_id] = threading.Event()
+        try:
+            self._queue.put_nowait((job_id, func, args, time.time()))
+        except queue.Full:
+            with self._lock:
+                self._cancel_events.pop(job_id, None)
+                self._counters['rejected'] += 1
+            return False
+        with self._lock:
+            self._counters['submitted'] += 1
+        return True
+
+    def cancel(self, job_id):
+        """İşi iptal et (kuyruktaysa hiç başlamaz, çalışıyorsa sonraki aşamada durur)"""
+        with self._lock:
+            event = self._cancel_events.get(job_id)
+        if event is None:
+            return False
+        event.set()
+        return True
+
+    def is_cancelled(self, job_id):
+        """İş iptal edildi mi"""
+        with self._lock:
+            event = self._cancel_events.get(job_id)
+        return event is not None and event.is_set()
+
+    def check_cancelled(self, job_id):
+        """İptal edildiyse JobCancelled fırlat (aşama sınırlarında çağrılır)"""
+        if self.is_cancelled(job_id):
+            raise JobCancelled(job_id)
+
+    def _worker(self):
+        while True:
+            job_id, func, args, queued_at = self._queue.get()
+            try:
+                if self.is_cancelled(job_id):
+                    with self._lock:
+                        self._counters['cancelled'] += 1
+                    continue
+                with self._lock:
+                    self._active.add(job_id)
+                    self._started += 1
+                    self._wait_total += time.time() - queued_at
+                try:
+                    func(*args)
+                    outcome = 'cancelled' if self.is_cancelled(job_id) else 'completed'
+                except JobCancelled:
+                    outcome = 'cancelled'
+                except Exception as e:
+                    print(f"[ERROR] Job {job_id} failed: {e}")
+                    outcome = 'failed'
+                with self._lock:
+                    self._counters[outcome] += 1
+            finally:
+                with self._lock:
+                    self._active.discard(job_id)
+                    self._cancel_events.pop(job_id, None)
+                self._queue.task_done()
+
+    def metrics(self):
+        """Kuyruk metrikleri (/api/status için)"""
+        with self._lock:
+            started = self._started
+            return {
+                'workers': self.workers,
+                'active': len(self._active),
+                'queued': self._queue.qsize(),
+                'max_queue': self.max_queue,
+                'avg_wait_s': round(self._wait_total / started, 3) if started else None,
+                **self._counters
+            }
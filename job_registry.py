@@ -0,0 +1,240 @@
+# -*- coding: utf-8 -*-
+"""
+Job Registry
+İş durumları için kilitli, süreli (TTL) ve isteğe bağlı SQLite kalıcılıklı kayıt defteri
+"""
+
+import json
+import os
+import secrets
+import sqlite3
+import threading
+import time
+from datetime import datetime, timezone
+
+JOB_TTL = float(os.getenv('JOB_TTL', '3600'))  # Biten işler bellekte bu kadar saniye kalır
+JOB_DB_PATH = os.getenv('JOB_DB_PATH', os.path.join('output', 'jobs.sqlite3'))  # '' = kalıcılık kapalı
+JOB_DB_RETENTION = float(os.getenv('JOB_DB_RETENTION', str(7 * 24 * 3600)))
+TERMINAL_STATUSES = ('completed', 'error', 'cancelled')
+# Başka süreçteki işler için kalıcı depoyu yoklama aralığı (saniye; bu süreçten bildirim gelmez)
+JOB_DB_POLL_INTERVAL = float(os.getenv('JOB_DB_POLL_INTERVAL', '1.0'))
+
+# İş kimliği üretimi: süreç başına rastgele düğüm + süreç içi monoton sayaç
+_id_lock = threading.Lock()
+_id_state = {'last_us': 0, 'seq': 0, 'pid': None, 'node': None}
+
+def new_job_id(prefix):
+    """Zamana göre sıralanan, çok süreçte de çakışmayan iş kimliği
+
+    Biçim: <prefix>_<YYYYMMDD>_<HHMMSS>_<mikrosaniye>_<sayaç>_<düğüm>
+    """
+    with _id_lock:
+        pid = os.getpid()
+        if _id_state['pid'] != pid:  # fork sonrası yeni düğüm
+            _id_state.update(pid=pid, node=f"{pid & 0xffff:04x}{secrets.token_hex(2)}", last_us=0, seq=0)
+        now_us = int(time.time() * 1_000_000)
+        if now_us <= _id_state['last_us']:
+            # Aynı mikrosaniye veya saat geri gitti: zamanı sabit tut, sayacı artır
+            now_us = _id_state['last_us']
+            _id_state['seq'] += 1
+        else:
+            _id_state['seq'] = 0
+        _id_state['last_us'] = now_us
+        seq = _id_state['seq']
+        node = _id_state['node']
+    ts = datetime.fromtimestamp(now_us // 1_000_000, tz=timezone.utc).strftime('%Y%m%d_%H%M%S')
+    return f"{prefix}_{ts}_{now_us % 1_000_000:06d}_{seq:04x}_{node}"
+
+class JobRecord:
+    """Tek iş kaydı (sabit alanlar + ek alanlar)"""
+
+    __slots__ = ('job_id', 'status', 'progress', 'message', 'result', 'extra', 'created', 'updated')
+
+    def __init__(self, job_id, status='queued', progress=0, message='', result=None, extra=None,
+                 created=None, updated=None):
+        self.job_id = job_id
+        self.status = status
+        self.progress = progress
+        self.message = message
+        self.result = result
+        self.extra = extra or {}
+        self.created = created or time.time()
+        self.updated = updated or self.created
+
+    def apply(self, fields):
+        """Alanları güncelle; bilinmeyenler extra'ya"""
+        for key, value in fields.items():
+            if key in ('status', 'progress', 'message', 'result'):
+                setattr(self, key, value)
+            else:
+                self.extra[key] = value
+        # Kesin artan: updated hem bellekte hem SQLite'ta değişiklik sürümü olarak kullanılır
+        self.updated = max(time.time(), self.updated + 1e-6)
+
+    def is_finished(self):
+        return self.status in TERMINAL_STATUSES
+
+    def to_dict(self):
+        """API yanıtı için sözlük"""
+        data = dict(self.extra)
+        data.update({
+            'status': self.status,
+            'progress': self.progress,
+            'message': self.message,
+            'result': self.result
+        })
+        return data
+
+class JobRegistry:
+    """İş parçacığı güvenli iş kayıt defteri"""
+
+    def __init__(self, ttl=JOB_TTL, db_path=JOB_DB_PATH):
+        self.ttl = ttl
+        self._jobs = {}
+        self._lock = threading.RLock()
+        self._changed = threading.Condition(self._lock)
+        self._db = None
+        self._last_evict = 0.0
+        if db_path:
+            self._open_db(db_path)
+
+    def _open_db(self, db_path):
+        """SQLite deposunu aç (tablo yoksa oluştur)"""
+        try:
+            os.makedirs(os.path.dirname(db_path) or '.', exist_ok=True)
+            self._db = sqlite3.connect(db_path, check_same_thread=False)
+            self._db.execute('PRAGMA journal_mode=WAL')
+            self._db.execute('''CREATE TABLE IF NOT EXISTS jobs (
+                job_id TEXT PRIMARY KEY, status TEXT, progress INTEGER, message TEXT,
+                result TEXT, extra TEXT, created REAL, updated REAL)''')
+            self._db.commit()
+            print(f"[INFO] Job registry: {db_path}")
+        except sqlite3.Error as e:
+            print(f"[WARN] Job registry SQLite açılamadı, sadece bellek kullanılacak: {e}")
+            self._db = None
+
+    def recover_interrupted(self):
+        """Sunucu açılışında bir kez: yarıda kalmış işleri hatalı işaretle, eski kayıtları sil"""
+        if self._db is None:
+            return
+        with self._lock:
+            try:
+                placeholders = ','.join('?' * len(TERMINAL_STATUSES))
+                self._db.execute(f"UPDATE jobs SET status='error', message=? WHERE status NOT IN ({placeholders})",
+                                 ('Sunucu yeniden başlatıldı, iş yarıda kaldı',) + TERMINAL_STATUSES)
+                self._db.execute('DELETE FROM jobs WHERE updated < ?', (time.time() - JOB_DB_RETENTION,))
+                self._db.commit()
+            except sqlite3.Error as e:
+                print(f"[WARN] Job registry temizlenemedi: {e}")
+
+    def _persist(self, rec):
+        if self._db is None:
+            return
+        try:
+            self._db.execute('INSERT OR REPLACE INTO jobs VALUES (?, ?, ?, ?, ?, ?, ?, ?)', (
+                rec.job_id, rec.status, rec.progress, rec.message,
+                json.dumps(rec.result, ensure_ascii=False, default=str),
+                json.dumps(rec.extra, ensure_ascii=False, default=str),
+                rec.created, rec.updated))
+            self._db.commit()
+        except sqlite3.Error as e:
+            print(f"[WARN] Job registry yazılamadı ({rec.job_id}): {e}")
+
+    def _load(self, job_id):
+        if self._db is None:
+            return None
+        row = self._db.execute('SELECT * FROM jobs WHERE job_id = ?', (job_id,)).fetchone()
+        if row is None:
+            return None
+        _, status, progress, message, result, extra, created, updated = row
+        return JobRecord(job_id, status, progress, message, json.loads(result) if result else None,
+                         json.loads(extra) if extra else {}, created, updated)
+
+    def create(self, job_id, **fields):
+        """Yeni iş kaydı oluştur"""
+        with self._lock:
+            self.evict_expired()
+            rec = JobRecord(job_id)
+            rec.apply(fields)
+            self._jobs[job_id] = rec
+            self._persist(rec)
+            self._changed.notify_all()
+            return rec.to_dict()
+
+    def update(self, job_id, fields=None, **kwargs):
+        """İş kaydını güncelle (yoksa None)"""
+        with self._lock:
+            rec = self._jobs.get(job_id)
+            if rec is None:
+                return None
+            rec.apply(dict(fields or {}, **kwargs))
+            self._persist(rec)
+            self._changed.notify_all()
+            return rec.to_dict()
+
+    def get(self, job_id):
+        """İş kaydının kopyası; bellekte yoksa kalıcı depodan"""
+        with self._lock:
+            rec = self._jobs.get(job_id)
+            if rec is None:
+                rec = self._load(job_id)
+                if rec is None:
+                    return None
+                if rec.is_finished():
+                    self._jobs[job_id] = rec
+            return rec.to_dict()
+
+    def wait_for_change(self, job_id, version, timeout=15.0):
+        """Kaydın `updated` zamanı `version`'dan büyük olana kadar bekle; (updated, kayıt) veya zaman aşımında (version, None)
+
+        Bellekte olmayan (başka süreçte çalışan) işler için SQLite JOB_DB_POLL_INTERVAL aralıkla yoklanır.
+        """
+        deadline = time.time() + timeout
+        with self._changed:
+            while True:
+                rec = self._jobs.get(job_id)
+                if rec is None:
+                    rec = self._load(job_id)
+                    if rec is None:
+                        return version, None
+                    if rec.is_finished():
+                        self._jobs[job_id] = rec
+                    wait = JOB_DB_POLL_INTERVAL
+                else:
+                    wait = None
+                if rec.updated > version:
+                    return rec.updated, rec.to_dict()
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    return version, None
+                self._changed.wait(remaining if wait is None else min(remaining, wait))
+
+    def __contains__(self, job_id):
+        return self.get(job_id) is not None
+
+    def remove(self, job_id):
+        """Kaydı tamamen sil (örn. kuyruğa alınamayan iş)"""
+        with self._lock:
+            self._jobs.pop(job_id, None)
+            if self._db is not None:
+                self._db.execute('DELETE FROM jobs WHERE job_id = ?', (job_id,))
+                self._db.commit()
+
+    def evict_expired(self, force=False):
+        """TTL'i dolmuş biten işleri bellekten çıkar (kalıcı depoda kalırlar)"""
+        now = time.time()
+        with self._lock:
+            if not force and now - self._last_evict < 60:
+                return 0
+            self._last_evict = now
+            expired = [job_id for job_id, rec in self._jobs.items()
+                       if rec.is_finished() and now - rec.updated > self.ttl]
+            for job_id in expired:
+                del self._jobs[job_id]
+            return len(expired)
+
+    def metrics(self):
+        """Kayıt defteri metrikleri"""
+        with self._lock:
+            active = sum(1 for rec in self._jobs.values() if not rec.is_finished())
+            return {'in_memory': len(self._jobs), 'active': active, 'persistent': self._db is not None}
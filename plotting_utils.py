@@ -5,12 +5,115 @@ Harita ve görselleştirme fonksiyonları
 """
 
 import os
+import threading
+import uuid
 from datetime import datetime
 import matplotlib.pyplot as plt
+from matplotlib.collections import PathCollection
+from matplotlib.ticker import MaxNLocator
 import cartopy.crs as ccrs
 import cartopy.feature as cfeature
+from cartopy.mpl.ticker import LatitudeFormatter, LongitudeFormatter
 from weather_utils import BBOX, OUTPUT_DIR
 
+try:
+    from cartopy.mpl.path import shapely_to_path
+except ImportError:  # cartopy < 0.22
+    from cartopy.mpl.patch import geos_to_path as shapely_to_path
+
+# Statik coğrafya (kıyı, sınır, kara, deniz) bbox başına bir kez seçilip yola çevrilir, her çizimde tekrar kullanılır
+BASEMAP_CACHE = os.getenv('BASEMAP_CACHE', '1') != '0'  # '0' = her çizimde GeoAxes + add_feature (eski yol)
+BASEMAP_PROJECTION = 'PlateCarree'  # Veri lon/lat: eksen koordinatları doğrudan derece
+BASEMAP_FEATURES = [
+    (cfeature.COASTLINE, {'linewidth': 0.6}),
+    (cfeature.BORDERS, {'linewidth': 0.6}),
+    (cfeature.LAND, {'alpha': 0.3, 'color': 'lightgray'}),
+    (cfeature.OCEAN, {'alpha': 0.3, 'color': 'lightblue'}),
+]
+OUTLINE_FEATURES = [(cfeature.COASTLINE, {}), (cfeature.BORDERS, {})]  # Hızlı önizleme
+_basemaps = {}
+_basemap_lock = threading.Lock()
+
+def _feature_style(feature, kwargs):
+    """add_feature ile aynı stil kuralları (color -> yüz+kenar, 'never' yüz yok, varsayılan zorder 1.5)"""
+    style = dict(feature.kwargs, **kwargs)
+    if 'color' in style:
+        style['facecolor'] = style['edgecolor'] = style.pop('color')
+    if isinstance(style.get('facecolor'), str) and style['facecolor'] == 'never':
+        style['facecolor'] = 'none'
+    style.setdefault('zorder', 1.5)
+    return style
+
+def get_basemap(bbox=BBOX, features=BASEMAP_FEATURES, projection=BASEMAP_PROJECTION):
+    """(bbox, projeksiyon) ile kesişen, projekte edilmiş özellik yolları: [(yollar, stil), ...]
+
+    Çizgi kalınlıkları punto cinsinden olduğundan figsize/dpi'dan bağımsızdır; süreç içinde bellekte tutulur.
+    """
+    crs = getattr(ccrs, projection)()
+    extent = [bbox[0], bbox[2], bbox[1], bbox[3]]
+    layers = []
+    for feature, kwargs in features:
+        key = (tuple(bbox), projection, id(feature))
+        with _basemap_lock:
+            paths = _basemaps.get(key)
+        if paths is None:
+            paths = []
+            for geom in feature.intersecting_geometries(extent):
+                # Aynı CRS'de projeksiyon gereksiz (FeatureArtist ile aynı kısayol)
+                projected = geom if feature.crs == crs else crs.project_geometry(geom, feature.crs)
+                if not projected.is_empty:
+                    paths.append(shapely_to_path(projected))
+            with _basemap_lock:
+                _basemaps[key] = paths
+        layers.append((paths, _feature_style(feature, kwargs)))
+    return layers
+
+def add_map_axes(fig, bbox, subplot=(1, 1, 1), gridlines=False, features=BASEMAP_FEATURES):
+    """Harita ekseni ve statik katmanlar; (eksen, veri çizimi için ek argümanlar)
+
+    Önbellek açıkken düz matplotlib ekseni + önbellekteki yollar kullanılır (GeoAxes ve Gridliner kurulmaz).
+    """
+    extent = [bbox[0], bbox[2], bbox[1], bbox[3]]
+    if not BASEMAP_CACHE:
+        ax = fig.add_subplot(*subplot, projection=ccrs.PlateCarree())
+        ax.set_extent(extent, crs=ccrs.PlateCarree())
+        for feature, kwargs in features:
+            ax.add_feature(feature, **kwargs)
+        if gridlines:
+            gl = ax.gridlines(draw_labels=True, linewidth=0.5, color='gray', alpha=0.6, linestyle='--')
+            gl.top_labels = False
+            gl.right_labels = False
+        return ax, {'transform': ccrs.PlateCarree()}
+
+    ax = fig.add_subplot(*subplot)
+    for paths, style in get_basemap(bbox, features):
+        ax.add_collection(PathCollection(paths, **style), autolim=False)
+    ax.set_xlim(extent[0], extent[1])
+    ax.set_ylim(extent[2], extent[3])
+    ax.set_aspect('equal')
+    if gridlines:
+        ax.grid(linewidth=0.5, color='gray', alpha=0.6, linestyle='--')
+        ax.xaxis.set_major_locator(MaxNLocator(nbins=6))
+        ax.yaxis.set_major_locator(MaxNLocator(nbins=6))
+        ax.xaxis.set_major_formatter(LongitudeFormatter())
+        ax.yaxis.set_major_formatter(LatitudeFormatter())
+    else:
+        ax.set_xticks([])
+        ax.set_yticks([])
+    return ax, {}
+
+def unique_png_path(prefix, output_dir=OUTPUT_DIR):
+    """Eşzamanlı çizimlerde çakışmayan dosya adı (aynı saniyede birden çok analiz olabilir)"""
+    stamp = datetime.utcnow().strftime('%Y%m%dT%H%M%S')
+    return os.path.join(output_dir, f"{prefix}_{stamp}_{uuid.uuid4().hex[:8]}.png")
+
+def finish_map_axes(ax):
+    """xarray.plot'un eklediği eksen başlıklarını temizle (GeoAxes'te bunlar görünmez)"""
+    if not BASEMAP_CACHE:
+        return
+    ax.set_xlabel('')
+    ax.set_ylabel('')
+
 def plot_weather_map(processed_data, dates, bbox=BBOX, save_path=None):
     """Birleşik hava durumu haritası çiz"""
     print("[STEP] Plotting combined map ...")
@@ -23,55 +126,40 @@ def plot_weather_map(processed_data, dates, bbox=BBOX, save_path=None):
     aero_s = processed_data['aerosol']
     drought_index = processed_data['drought_index']
     
-    # Harita oluştur
+    # Harita oluştur (statik katmanlar önbellekten)
     fig = plt.figure(figsize=(12, 10))
-    ax = plt.axes(projection=ccrs.PlateCarree())
-    ax.set_extent([bbox[0], bbox[2], bbox[1], bbox[3]], crs=ccrs.PlateCarree())
-    
-    # Harita özellikleri
-    ax.add_feature(cfeature.COASTLINE, linewidth=0.6)
-    ax.add_feature(cfeature.BORDERS, linewidth=0.6)
-    ax.add_feature(cfeature.LAND, alpha=0.3, color='lightgray')
-    ax.add_feature(cfeature.OCEAN, alpha=0.3, color='lightblue')
-    
-    # Grid
-    gl = ax.gridlines(draw_labels=True, linewidth=0.5, color='gray', alpha=0.6, linestyle='--')
-    gl.top_labels = False
-    gl.right_labels = False
+    ax, geo = add_map_axes(fig, bbox, gridlines=True)
     
     # Yağış (mavi tonlar)
     if precip_mm_day is not None:
-        im1 = precip_mm_day.plot(ax=ax, transform=ccrs.PlateCarree(), 
-                               cmap="Blues", alpha=0.85, add_colorbar=False)
+        im1 = precip_mm_day.plot(ax=ax, cmap="Blues", alpha=0.85, add_colorbar=False, **geo)
         plt.colorbar(im1, ax=ax, fraction=0.037, pad=0.02).set_label("Yağış (mm/gün)")
     
     # Kuraklık indeksi (kırmızı tonlar)
-    im2 = drought_index.plot(ax=ax, transform=ccrs.PlateCarree(), 
-                           cmap="Reds", alpha=0.38, add_colorbar=False)
+    im2 = drought_index.plot(ax=ax, cmap="Reds", alpha=0.38, add_colorbar=False, **geo)
     plt.colorbar(im2, ax=ax, fraction=0.037, pad=0.1).set_label("Kuraklık İndeksi (0..1)")
     
     # Sıcaklık konturları
-    temp_s.plot.contour(ax=ax, transform=ccrs.PlateCarree(), 
-                       colors='k', linewidths=0.6, add_colorbar=False, levels=10)
+    temp_s.plot.contour(ax=ax, colors='k', linewidths=0.6, add_colorbar=False, levels=10, **geo)
     
     # Rüzgar vektörleri
     if u_s is not None and v_s is not None:
         skip = (slice(None, None, 6), slice(None, None, 6))
         ax.quiver(u_s["lon"].values[skip[1]], u_s["lat"].values[skip[0]],
-                 u_s.values[skip], v_s.values[skip], 
-                 transform=ccrs.PlateCarree(), color='gray', scale=300, alpha=0.7)
+                 u_s.values[skip], v_s.values[skip],
+                 color='gray', scale=300, alpha=0.7, **geo)
     
     # Aerosol
     if aero_s is not None:
-        aero_s.plot(ax=ax, transform=ccrs.PlateCarree(), 
-                   cmap="YlGnBu_r", alpha=0.25, add_colorbar=False)
+        aero_s.plot(ax=ax, cmap="YlGnBu_r", alpha=0.25, add_colorbar=False, **geo)
     
     # Başlık
-    plt.title(f'Hava Durumu Analizi - {dates[0]} / {dates[1]}', fontsize=14, pad=20)
+    finish_map_axes(ax)
+    ax.set_title(f'Hava Durumu Analizi - {dates[0]} / {dates[1]}', fontsize=14, pad=20)
     
     # Kaydet
     if save_path is None:
-        save_path = os.path.join(OUTPUT_DIR, f"weather_map_{datetime.utcnow().strftime('%Y%m%dT%H%M%S')}.png")
+        save_path = unique_png_path('weather_map')
     
     plt.savefig(save_path, dpi=220, bbox_inches='tight')
     plt.close(fig)
@@ -79,30 +167,28 @@ def plot_weather_map(processed_data, dates, bbox=BBOX, save_path=None):
     print(f"[DONE] Harita kaydedildi: {save_path}")
     return save_path
 
-def create_quick_plot(processed_data, dates, bbox=BBOX):
+def create_quick_plot(processed_data, dates, bbox=BBOX, save_path=None):
     """Hızlı önizleme haritası"""
     temp_s = processed_data['temperature_c']
     drought_index = processed_data['drought_index']
     
-    fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(15, 6), 
-                                  subplot_kw={'projection': ccrs.PlateCarree()})
+    fig = plt.figure(figsize=(15, 6))
     
     # Sıcaklık haritası
-    ax1.set_extent([bbox[0], bbox[2], bbox[1], bbox[3]], crs=ccrs.PlateCarree())
-    ax1.add_feature(cfeature.COASTLINE)
-    ax1.add_feature(cfeature.BORDERS)
-    temp_s.plot(ax=ax1, transform=ccrs.PlateCarree(), cmap="RdYlBu_r")
+    ax1, geo = add_map_axes(fig, bbox, subplot=(1, 2, 1), features=OUTLINE_FEATURES)
+    temp_s.plot(ax=ax1, cmap="RdYlBu_r", **geo)
+    finish_map_axes(ax1)
     ax1.set_title('Sıcaklık (°C)')
     
     # Kuraklık haritası
-    ax2.set_extent([bbox[0], bbox[2], bbox[1], bbox[3]], crs=ccrs.PlateCarree())
-    ax2.add_feature(cfeature.COASTLINE)
-    ax2.add_feature(cfeature.BORDERS)
-    drought_index.plot(ax=ax2, transform=ccrs.PlateCarree(), cmap="Reds")
+    ax2, geo = add_map_axes(fig, bbox, subplot=(1, 2, 2), features=OUTLINE_FEATURES)
+    drought_index.plot(ax=ax2, cmap="Reds", **geo)
+    finish_map_axes(ax2)
     ax2.set_title('Kuraklık İndeksi')
     
     plt.tight_layout()
-    save_path = os.path.join(OUTPUT_DIR, f"quick_plot_{datetime.utcnow().strftime('%Y%m%dT%H%M%S')}.png")
+    if save_path is None:
+        save_path = unique_png_path('quick_plot')
     plt.savefig(save_path, dpi=150, bbox_inches='tight')
     plt.close(fig)
     
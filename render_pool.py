@@ -0,0 +1,145 @@
+# -*- coding: utf-8 -*-
+"""
+Render Pool
+Harita çizimleri için önceden ısıtılmış süreç havuzu (Agg, paylaşımlı bellek ile veri aktarımı)
+
+matplotlib/pyplot global durumu süreç başına ayrı olduğundan eşzamanlı analizlerin
+çizimleri birbirini bozmaz ve GIL'e takılmadan çekirdek sayısıyla ölçeklenir.
+"""
+
+import atexit
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import get_context, shared_memory
+
+import numpy as np
+import xarray as xr
+
+RENDER_POOL = os.getenv('RENDER_POOL', '1') != '0'  # '0' = çizimler çağıran iş parçacığında
+RENDER_WORKERS = int(os.getenv('RENDER_WORKERS', str(min(4, os.cpu_count() or 1))))
+RENDER_FIELDS = ('temperature_c', 'precipitation_mm_day', 'drought_index', 'u_wind', 'v_wind', 'aerosol')
+
+_pool_lock = threading.Lock()
+_pool = None
+_inline_lock = threading.Lock()  # pyplot global durumu: süreç içi çizimler sırayla
+
+def _init_worker():
+    """İşçi başlangıcı: Agg arka ucu, ağır modüller ve basemap önbelleği bir kez yüklenir"""
+    import matplotlib
+    matplotlib.use('Agg')
+    import plotting_utils
+    try:
+        plotting_utils.get_basemap()
+        plotting_utils.get_basemap(features=plotting_utils.OUTLINE_FEATURES)
+    except Exception as e:  # Natural Earth verisi yoksa ilk çizimde tekrar denenir
+        print(f"[WARN] Render worker basemap ısıtılamadı: {e}")
+
+def _ping():
+    return os.getpid()
+
+def get_render_pool():
+    """Tembel oluşturulan süreç havuzu (spawn: fork edilen Flask/iş parçacığı durumu taşınmaz)"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=max(1, RENDER_WORKERS), mp_context=get_context('spawn'),
+                                        initializer=_init_worker)
+        return _pool
+
+def start_render_pool():
+    """Havuzu başlat ve tüm işçilerin hazır olmasını bekle (sunucu açılışında çağrılır)"""
+    if not RENDER_POOL:
+        return []
+    pool = get_render_pool()
+    pids = sorted({f.result() for f in [pool.submit(_ping) for _ in range(max(1, RENDER_WORKERS))]})
+    print(f"[INFO] Render pool hazır: {len(pids)} süreç")
+    return pids
+
+def shutdown_render_pool():
+    """Havuzu kapat"""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+
+atexit.register(shutdown_render_pool)
+
+def pack_fields(processed_data):
+    """Çizimde kullanılan alanları tek paylaşımlı bellek bloğuna kopyala; (blok, tanımlar)"""
+    arrays, specs, offset = {}, {}, 0
+    for key in RENDER_FIELDS:
+        da = processed_data.get(key)
+        if da is None:
+            continue
+        values = np.ascontiguousarray(da.values)
+        arrays[key] = values
+        specs[key] = {
+            'offset': offset,
+            'shape': values.shape,
+            'dtype': values.dtype.str,
+            'dims': da.dims,
+            'coords': {name: (c.dims, c.values) for name, c in da.coords.items()},
+            'name': da.name,
+            'attrs': dict(da.attrs)
+        }
+        offset += values.nbytes
+    shm = shared_memory.SharedMemory(create=True, size=max(1, offset))
+    for key, values in arrays.items():
+        spec = specs[key]
+        np.ndarray(spec['shape'], dtype=spec['dtype'], buffer=shm.buf, offset=spec['offset'])[...] = values
+    return shm, specs
+
+def unpack_fields(shm, specs):
+    """Paylaşımlı bellekteki alanları (kopyasız) DataArray olarak aç"""
+    processed = {key: None for key in RENDER_FIELDS}
+    for key, spec in specs.items():
+        values = np.ndarray(spec['shape'], dtype=spec['dtype'], buffer=shm.buf, offset=spec['offset'])
+        processed[key] = xr.DataArray(values, dims=spec['dims'], coords=spec['coords'],
+                                      name=spec['name'], attrs=spec['attrs'])
+    return processed
+
+def _render_task(kind, shm_name, specs, dates, bbox, save_path):
+    """İşçide çalışır: paylaşımlı bellekten alanları okuyup PNG yazar"""
+    import plotting_utils
+    shm = shared_memory.SharedMemory(name=shm_name)  # Silme (unlink) oluşturan süreçte
+    try:
+        processed = unpack_fields(shm, specs)
+        render = plotting_utils.plot_weather_map if kind == 'map' else plotting_utils.create_quick_plot
+        path = render(processed, dates, bbox=bbox, save_path=save_path)
+        del processed
+        return path
+    finally:
+        shm.close()
+
+def render_maps(processed_data, dates, bbox=None):
+    """Ana harita ve hızlı önizlemeyi paralel çiz; (harita yolu, önizleme yolu)
+
+    Havuz kapalıysa veya bozulduysa çizimler çağıran iş parçacığında yapılır.
+    """
+    from plotting_utils import unique_png_path
+    from weather_utils import BBOX
+    bbox = bbox or BBOX
+    map_path = unique_png_path('weather_map')
+    quick_path = unique_png_path('quick_plot')
+    if RENDER_POOL:
+        shm, specs = pack_fields(processed_data)
+        try:
+            pool = get_render_pool()
+            futures = [pool.submit(_render_task, kind, shm.name, specs, dates, bbox, path)
+                       for kind, path in (('map', map_path), ('quick', quick_path))]
+            wait(futures)  # Blok ancak iki çizim de bittikten sonra silinir
+            return tuple(f.result() for f in futures)
+        except BrokenProcessPool as e:
+            print(f"[WARN] Render pool bozuldu, çizim iş parçacığında yapılacak: {e}")
+            shutdown_render_pool()
+        finally:
+            shm.close()
+            shm.unlink()
+
+    from plotting_utils import create_quick_plot, plot_weather_map
+    with _inline_lock:
+        return (plot_weather_map(processed_data, dates, bbox=bbox, save_path=map_path),
+                create_quick_plot(processed_data, dates, bbox=bbox, save_path=quick_path))
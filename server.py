@@ -5,28 +5,55 @@ NASA Weather Analysis - Flask Backend
 Web API sunucusu
 """
 
-from flask import Flask, request, jsonify, render_template, send_from_directory
+from flask import Flask, Response, request, jsonify, render_template, send_from_directory, stream_with_context
 from flask_cors import CORS
 import os
 import json
 import threading
+import time
 from datetime import datetime
 import traceback
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 # Kendi modüllerimizi import et
 from weather_utils import (
-    ensure_output_dir, login_earthaccess, login_earthaccess_with_credentials, fetch_weather_data, 
-    extract_variables, process_variables, create_summary
+    BBOX, COLLECTIONS, AGGREGATE_TIME, ensure_output_dir, login_earthaccess, login_earthaccess_with_credentials,
+    fetch_and_process, create_summary
 )
-from plotting_utils import plot_weather_map, create_quick_plot
-from ai_analysis import call_gemini_analysis, format_analysis_output
+import render_pool
+import tile_utils
+from field_store import FIELD_ENCODINGS, field_metadata, get_encoded_field, load_fields, save_fields
+from ai_analysis import call_gemini_analysis, call_gemini_batch, format_analysis_output, llm_cache_stats, stream_gemini_analysis
+from job_queue import JobQueue, JobCancelled
+from cache_utils import TTLCache
+from job_registry import JobRegistry, TERMINAL_STATUSES, new_job_id
+from history_index import HistoryIndex
 
 app = Flask(__name__)
 CORS(app)  # JavaScript frontend'den API çağrıları için
 
 # Global değişkenler
 earthaccess_logged_in = False
-current_analysis = {}
+# Render süreçleri (spawn) bu modülü __mp_main__ olarak yeniden içe aktarır:
+# kalıcı durum (SQLite) ve yeniden başlatma temizliği sadece sunucu sürecinde
+if __name__ != '__mp_main__':
+    jobs = JobRegistry()
+    jobs.recover_interrupted()
+    history = HistoryIndex()
+else:
+    jobs = history = None
+job_queue = JobQueue()
+# Aynı parametreli, devam eden analizler: normalize anahtar -> analysis_id
+inflight_analyses = {}
+inflight_lock = threading.Lock()
+# Tamamlanmış analiz sonuçları: normalize anahtar -> {'analysis_id', 'result'}
+RESULT_CACHE_TTL = float(os.getenv('RESULT_CACHE_TTL', '3600'))
+RESULT_CACHE_MAX_ENTRIES = int(os.getenv('RESULT_CACHE_MAX_ENTRIES', '128'))
+AI_PARTIAL_INTERVAL = float(os.getenv('AI_PARTIAL_INTERVAL', '0.5'))  # saniye; kısmi AI metni yayın aralığı
+# Kişisel tahmin için geçmiş pencere (gün). Toplu modda pencerenin tüm saatleri 4 koleksiyondan çekilir:
+# maliyet gün sayısıyla doğrusal (365 gün = 4 × 365 granül, 8760 saat); günlük depo tekrarları önler.
+PREDICTION_LOOKBACK_DAYS = int(os.getenv('PREDICTION_LOOKBACK_DAYS', '30'))
+result_cache = TTLCache(max_entries=RESULT_CACHE_MAX_ENTRIES, ttl=RESULT_CACHE_TTL)
 
 @app.route('/')
 def index():
@@ -39,6 +66,10 @@ def api_status():
     return jsonify({
         'status': 'online',
         'earthaccess_logged_in': earthaccess_logged_in,
+        'queue': job_queue.metrics(),
+        'result_cache': result_cache.stats(),
+        'llm_cache': llm_cache_stats(),
+        'jobs': jobs.metrics(),
         'timestamp': datetime.now().isoformat()
     })
 
@@ -84,8 +115,6 @@ def api_login():
 @app.route('/api/analyze', methods=['POST'])
 def api_analyze():
     """Hava durumu analizi başlat"""
-    global current_analysis
-    
     try:
         data = request.get_json()
         start_date = data.get('start_date')
@@ -104,26 +133,62 @@ def api_analyze():
                 'message': 'Önce EarthAccess login yapmalısınız'
             }), 401
         
-        # Analizi arka planda başlat
-        analysis_id = f"analysis_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
-        current_analysis[analysis_id] = {
-            'status': 'started',
-            'progress': 0,
-            'message': 'Analiz başlatılıyor...',
-            'result': None
-        }
+        key = analysis_key(start_date, end_date, BBOX, include_ai)
+        
+        # Aynı analiz yakın zamanda tamamlandıysa sonucu hemen döndür
+        cached = result_cache.get(key, validate=cached_files_exist)
+        if cached is not None:
+            analysis_id = cached['analysis_id']
+            if analysis_id not in jobs:
+                jobs.create(analysis_id, **{
+                    'status': 'completed',
+                    'progress': 100,
+                    'message': 'Analiz tamamlandı! (önbellek)',
+                    'result': cached['result'],
+                    'result_key': key
+                })
+            return jsonify({
+                'success': True,
+                'analysis_id': analysis_id,
+                'cached': True,
+                'result': cached['result'],
+                'message': 'Analiz önbellekten döndürüldü'
+            })
         
-        # Thread'de analizi çalıştır
-        thread = threading.Thread(
-            target=run_analysis_thread,
-            args=(analysis_id, start_date, end_date, include_ai)
-        )
-        thread.daemon = True
-        thread.start()
+        with inflight_lock:
+            # Aynı analiz zaten sürüyorsa ona bağlan
+            existing_id = inflight_analyses.get(key)
+            existing = jobs.get(existing_id) if existing_id else None
+            if existing and existing['status'] not in TERMINAL_STATUSES:
+                jobs.update(existing_id, subscribers=existing.get('subscribers', 1) + 1)
+                return jsonify({
+                    'success': True,
+                    'analysis_id': existing_id,
+                    'coalesced': True,
+                    'message': 'Aynı analiz zaten çalışıyor, sonucu paylaşılacak'
+                })
+            
+            # Analizi arka planda başlat
+            analysis_id = new_job_id('analysis')
+            jobs.create(analysis_id, **{
+                'status': 'queued',
+                'progress': 0,
+                'message': 'Analiz sıraya alındı...',
+                'result': None,
+                'subscribers': 1,
+                'result_key': key  # Sonuç önbelleği anahtarı (sonradan eklenen AI yorumu için)
+            })
+            
+            # İşçi havuzunda çalıştır; kuyruk doluysa 429
+            if not job_queue.submit(analysis_id, run_analysis_thread, analysis_id, start_date, end_date, include_ai, key):
+                jobs.remove(analysis_id)
+                return queue_full_response()
+            inflight_analyses[key] = analysis_id
         
         return jsonify({
             'success': True,
             'analysis_id': analysis_id,
+            'coalesced': False,
             'message': 'Analiz başlatıldı'
         })
         
@@ -133,105 +198,444 @@ def api_analyze():
             'message': f'Analiz hatası: {str(e)}'
         }), 500
 
-def run_analysis_thread(analysis_id, start_date, end_date, include_ai):
+def normalize_date(value):
+    """Tarihi YYYY-MM-DD biçimine getir"""
+    try:
+        return datetime.fromisoformat(str(value).strip()).date().isoformat()
+    except ValueError:
+        return str(value).strip()
+
+def analysis_key(start_date, end_date, bbox, include_ai):
+    """Analiz parametrelerinden normalize anahtar (tarihler, bbox, değişkenler, AI)"""
+    variables = tuple(sorted(short_name for short_name, _ in COLLECTIONS.values()))
+    return (normalize_date(start_date), normalize_date(end_date),
+            tuple(round(float(v), 4) for v in bbox), variables,
+            'aggregate' if AGGREGATE_TIME else 'snapshot', bool(include_ai))
+
+def cached_files_exist(entry):
+    """Önbellekteki sonucun dosyaları hâlâ diskte mi"""
+    summary = entry['result'].get('summary', {})
+    for url in (summary.get('map_path'), summary.get('quick_plot_path'), entry['result'].get('output_file')):
+        if url and not os.path.exists(url.replace('/api/files/', 'output/', 1)):
+            return False
+    return True
+
+def release_inflight(key, analysis_id):
+    """Biten analizi devam edenler tablosundan çıkar"""
+    if key is None:
+        return
+    with inflight_lock:
+        if inflight_analyses.get(key) == analysis_id:
+            del inflight_analyses[key]
+
+def queue_full_response():
+    """Kuyruk dolu: 429 + Retry-After"""
+    response = jsonify({
+        'success': False,
+        'message': 'Sunucu meşgul, lütfen biraz sonra tekrar deneyin',
+        'queue': job_queue.metrics()
+    })
+    response.status_code = 429
+    response.headers['Retry-After'] = '30'
+    return response
+
+def mark_cancelled(analysis_id):
+    """İşi iptal edildi olarak işaretle"""
+    jobs.update(analysis_id, {
+        'status': 'cancelled',
+        'message': 'Analiz iptal edildi',
+        'result': None,
+        'partial': None
+    })
+
+def run_analysis_thread(analysis_id, start_date, end_date, include_ai, inflight_key=None):
     """Analizi arka planda çalıştır"""
-    global current_analysis
-    
     try:
         user_dates = (start_date, end_date)
+        job_queue.check_cancelled(analysis_id)
         
         # Progress güncelle
-        current_analysis[analysis_id].update({
+        jobs.update(analysis_id, {
             'status': 'fetching_data',
             'progress': 20,
             'message': 'NASA verisi çekiliyor...'
         })
         
-        # 1. Veri çekme
-        datasets = fetch_weather_data(dates=user_dates)
-        
-        current_analysis[analysis_id].update({
-            'progress': 40,
-            'message': 'Veri işleniyor...'
-        })
-        
-        # 2. Değişkenleri çıkarma ve işleme
-        variables = extract_variables(datasets)
-        processed_data = process_variables(variables)
+        # 1-2. Veri çekme ve işleme (toplu modda günlük depodaki günler tekrar çekilmez)
+        processed_data, fetch_timings = fetch_and_process(dates=user_dates)
+        job_queue.check_cancelled(analysis_id)
         
-        current_analysis[analysis_id].update({
+        jobs.update(analysis_id, {
             'progress': 60,
-            'message': 'Özet oluşturuluyor...'
+            'message': 'Özet oluşturuluyor...',
+            'fetch_timings': fetch_timings
         })
         
         # 3. Özet oluşturma
         summary = create_summary(processed_data, user_dates)
+        # Karo/alan uçları için ham ızgaralar (tembel karo üretimi bunlardan yapılır)
+        tiles = None
+        if save_fields(analysis_id, processed_data, summary['bbox']):
+            tiles = {
+                'url': f"/api/tiles/{{layer}}/{{z}}/{{x}}/{{y}}.png?analysis_id={analysis_id}",
+                'layers': list(tile_utils.TILE_LAYERS),
+                'max_zoom': tile_utils.TILE_MAX_ZOOM,
+                'bounds': summary['bbox']
+            }
         
-        current_analysis[analysis_id].update({
+        jobs.update(analysis_id, {
             'progress': 70,
-            'message': 'Harita çiziliyor...'
+            'message': 'Harita çiziliyor ve AI analizi yapılıyor...' if include_ai else 'Harita çiziliyor...'
         })
         
-        # 4. Harita çizme
-        map_path = plot_weather_map(processed_data, user_dates)
-        quick_path = create_quick_plot(processed_data, user_dates)
-        
-        # Dosya yollarını web için düzenle
-        summary['map_path'] = map_path.replace('output/', '/api/files/')
-        summary['quick_plot_path'] = quick_path.replace('output/', '/api/files/')
+        # 4-5. Harita çizimi ve AI analizi sadece özete bağlı: paralel çalışır, biten hemen bildirilir
+        def render_maps():
+            # Ayrı render süreçlerinde (render_pool) paralel çizilir
+            map_path, quick_path = render_pool.render_maps(processed_data, user_dates)
+            # Dosya yollarını web için düzenle
+            return {
+                'map_path': map_path.replace('output/', '/api/files/'),
+                'quick_plot_path': quick_path.replace('output/', '/api/files/')
+            }
         
-        current_analysis[analysis_id].update({
-            'progress': 80,
-            'message': 'AI analizi yapılıyor...' if include_ai else 'Analiz tamamlanıyor...'
-        })
+        partial = {}  # Biten parçalar tek alanda; tamamlanınca sadece result'ta kalır
+        partial_lock = threading.Lock()
+        
+        def publish(fields, drop=(), **job_fields):
+            # Kilit içinde yaz: iki iş parçacığının anlık görüntüleri sırasız uygulanmasın
+            with partial_lock:
+                for key in drop:
+                    partial.pop(key, None)
+                partial.update(fields)
+                jobs.update(analysis_id, dict(job_fields, partial=dict(partial)))
+        
+        def run_ai(ai_summary):
+            # Gemini yanıtı akarken kısmi metin ilerleme akışına (partial.ai_text) aralıklarla yazılır
+            parts = []
+            last_publish = [0.0]
+            
+            def on_text(text):
+                parts.append(text)
+                now = time.monotonic()
+                if now - last_publish[0] >= AI_PARTIAL_INTERVAL:
+                    last_publish[0] = now
+                    publish({'ai_text': "".join(parts)})
+            
+            # İptalde Gemini akışı bir sonraki parçada kesilir: havuz kapanışı tam yanıtı beklemez
+            text = call_gemini_analysis(ai_summary, on_text=on_text,
+                                        should_cancel=lambda: job_queue.is_cancelled(analysis_id))
+            job_queue.check_cancelled(analysis_id)
+            return format_analysis_output(text, ai_summary)
         
-        # 5. AI analizi (isteğe bağlı)
         ai_result = None
-        if include_ai:
-            ai_response = call_gemini_analysis(summary)
-            ai_result = format_analysis_output(ai_response, summary)
+        with ThreadPoolExecutor(max_workers=2, thread_name_prefix=f"analysis-{analysis_id[-8:]}") as pool:
+            tasks = {pool.submit(render_maps): 'maps'}
+            if include_ai:
+                tasks[pool.submit(run_ai, dict(summary))] = 'ai'
+            pending = set(tasks.values())
+            for future in as_completed(tasks):
+                name = tasks[future]
+                pending.discard(name)
+                if name == 'maps':
+                    fields = future.result()
+                    summary.update(fields)
+                    message = 'Harita hazır'
+                else:
+                    ai_result = future.result()
+                    fields = {'ai_analysis': ai_result}
+                    message = 'AI analizi hazır'
+                if pending:
+                    message += ', AI analizi bekleniyor...' if 'ai' in pending else ', harita çiziliyor...'
+                publish(fields, drop=('ai_text',) if name == 'ai' else (),
+                        message=message, progress=90 - 10 * len(pending))
+                job_queue.check_cancelled(analysis_id)
         
         # 6. Sonucu kaydet
         output_file = f"output/analysis_{analysis_id}.json"
         with open(output_file, 'w', encoding='utf-8') as f:
             json.dump(summary, f, indent=2, ensure_ascii=False)
+        history.add(os.path.basename(output_file), user_dates, os.path.getctime(output_file))
         
         # Analiz tamamlandı
-        current_analysis[analysis_id].update({
+        result = {
+            'summary': summary,
+            'ai_analysis': ai_result,
+            'output_file': output_file.replace('output/', '/api/files/'),
+            'tiles': tiles
+        }
+        if inflight_key is not None:
+            result_cache.set(inflight_key, {'analysis_id': analysis_id, 'result': result})
+        jobs.update(analysis_id, {
             'status': 'completed',
             'progress': 100,
             'message': 'Analiz tamamlandı!',
-            'result': {
-                'summary': summary,
-                'ai_analysis': ai_result,
-                'output_file': output_file.replace('output/', '/api/files/')
-            }
+            'result': result,
+            'partial': None
         })
         
+    except JobCancelled:
+        mark_cancelled(analysis_id)
+        raise
     except Exception as e:
         error_msg = f"Analiz hatası: {str(e)}"
         print(f"[ERROR] {error_msg}")
         print(traceback.format_exc())
         
-        current_analysis[analysis_id].update({
+        jobs.update(analysis_id, {
             'status': 'error',
             'progress': 0,
             'message': error_msg,
-            'result': None
+            'result': None,
+            'partial': None
         })
+        raise
+    finally:
+        release_inflight(inflight_key, analysis_id)
 
 @app.route('/api/progress/<analysis_id>')
 def api_progress(analysis_id):
     """Analiz ilerlemesini kontrol et"""
-    if analysis_id not in current_analysis:
+    job = jobs.get(analysis_id)
+    if job is None:
+        return jsonify({
+            'success': False,
+            'message': 'Analiz bulunamadı'
+        }), 404
+    
+    return jsonify({
+        'success': True,
+        'data': job
+    })
+
+SSE_KEEPALIVE = 15  # saniye
+
+def progress_event_stream(analysis_id):
+    """İş kaydındaki değişiklikleri SSE olarak gönder (sadece değişen alanlar)"""
+    def generate():
+        last = {}
+        version = -1
+        while True:
+            version, job = jobs.wait_for_change(analysis_id, version, timeout=SSE_KEEPALIVE)
+            if job is None:
+                if jobs.get(analysis_id) is None:
+                    yield "event: end\ndata: {}\n\n"
+                    return
+                yield ": keepalive\n\n"
+                continue
+            delta = {k: v for k, v in job.items() if k not in last or last[k] != v}
+            last = job
+            if delta:
+                yield f"data: {json.dumps(delta, ensure_ascii=False, default=str)}\n\n"
+            if job['status'] in TERMINAL_STATUSES:
+                yield "event: end\ndata: {}\n\n"
+                return
+    
+    return Response(stream_with_context(generate()), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+
+@app.route('/api/progress/<analysis_id>/stream')
+def api_progress_stream(analysis_id):
+    """Analiz ilerlemesi (Server-Sent Events)"""
+    if jobs.get(analysis_id) is None:
+        return jsonify({
+            'success': False,
+            'message': 'Analiz bulunamadı'
+        }), 404
+    return progress_event_stream(analysis_id)
+
+def sse_event(event, data):
+    """Tek bir SSE mesajı"""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False, default=str)}\n\n"
+
+@app.route('/api/ai-analysis/<analysis_id>/stream')
+def api_ai_analysis_stream(analysis_id):
+    """Tamamlanmış analizin özeti için Gemini yanıtını token token akıt (SSE)
+    
+    Olaylar: token {text}, done {ai_analysis}, error {message}
+    """
+    job = jobs.get(analysis_id)
+    if job is None or job['status'] != 'completed' or not job.get('result'):
+        return jsonify({
+            'success': False,
+            'message': 'Tamamlanmış analiz bulunamadı'
+        }), 404
+    summary = job['result'].get('summary') or job['result'].get('base_data')
+    
+    def generate():
+        parts = []  # Gemini yoksa ve önbellekte yanıt yoksa boş kalır -> temel özet
+        try:
+            for text in stream_gemini_analysis(summary):
+                parts.append(text)
+                yield sse_event('token', {'text': text})
+        except Exception as e:
+            print(f"[ERROR] Gemini API hatası: {e}")
+            yield sse_event('error', {'message': f'AI analizi hatası: {str(e)}'})
+            return
+        ai_result = format_analysis_output("".join(parts), summary)
+        result = dict(job['result'], ai_analysis=ai_result)
+        jobs.update(analysis_id, result=result)
+        # Aynı analizin önbellekteki sonucu da AI yorumunu içersin (TTL değişmez)
+        key = job.get('result_key')
+        if key:
+            result_cache.update(key, lambda cached: dict(cached, result=result)
+                                if cached['analysis_id'] == analysis_id else cached)
+        yield sse_event('done', {'ai_analysis': ai_result})
+    
+    return Response(stream_with_context(generate()), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+
+BATCH_MAX_ITEMS = 100
+
+@app.route('/api/ai-analysis/batch', methods=['POST'])
+def api_ai_analysis_batch():
+    """Birden çok özet için toplu AI analizi (gece raporları vb.)
+    
+    Gövde: {"analysis_ids": [...]} ve/veya {"summaries": [...]}, isteğe bağlı
+    "pack_size" (tek prompt'taki özet sayısı) ve "custom_prompt".
+    İlerleme /api/progress/<batch_id> ile izlenir; sonuç giriş sırasıyla liste.
+    """
+    try:
+        data = request.get_json(silent=True)
+        if not isinstance(data, dict):
+            return batch_bad_request('JSON gövde gerekli')
+        analysis_ids = data.get('analysis_ids') or []
+        summaries = data.get('summaries') or []
+        if not isinstance(analysis_ids, list) or not all(isinstance(i, str) for i in analysis_ids):
+            return batch_bad_request('analysis_ids metin listesi olmalı')
+        if not isinstance(summaries, list) or not all(isinstance(item, dict) for item in summaries):
+            return batch_bad_request('summaries nesne (özet) listesi olmalı')
+        try:
+            pack_size = int(1 if data.get('pack_size') is None else data['pack_size'])
+        except (TypeError, ValueError):
+            pack_size = 0
+        if isinstance(data.get('pack_size'), bool) or not 1 <= pack_size <= BATCH_MAX_ITEMS:
+            return batch_bad_request(f'pack_size 1-{BATCH_MAX_ITEMS} arası tam sayı olmalı')
+        custom_prompt = data.get('custom_prompt')
+        if custom_prompt is not None and not isinstance(custom_prompt, str):
+            return batch_bad_request('custom_prompt metin olmalı')
+        
+        items = []
+        for analysis_id in analysis_ids:
+            job = jobs.get(analysis_id)
+            result = (job or {}).get('result') or {}
+            summary = result.get('summary') or result.get('base_data')
+            if job is None or job['status'] != 'completed' or not summary:
+                return jsonify({
+                    'success': False,
+                    'message': f'Tamamlanmış analiz bulunamadı: {analysis_id}'
+                }), 404
+            items.append({'analysis_id': analysis_id, 'summary': summary})
+        items.extend({'analysis_id': None, 'summary': summary} for summary in summaries)
+    
+        if not items or len(items) > BATCH_MAX_ITEMS:
+            return jsonify({
+                'success': False,
+                'message': f'1-{BATCH_MAX_ITEMS} arası özet veya analysis_id gerekli'
+            }), 400
+    
+        batch_id = new_job_id('batch')
+        jobs.create(batch_id, **{
+            'status': 'queued',
+            'progress': 0,
+            'message': f'Toplu AI analizi sıraya alındı ({len(items)} özet)...',
+            'completed_items': 0,
+            'total_items': len(items)
+        })
+    
+        def run_batch():
+            try:
+                jobs.update(batch_id, status='running', progress=5, message='AI analizleri yapılıyor...')
+                done = [0]
+                done_lock = threading.Lock()
+            
+                def on_result(index, ai_result):
+                    with done_lock:
+                        done[0] += 1
+                        count = done[0]
+                    jobs.update(batch_id, completed_items=count, progress=5 + int(90 * count / len(items)),
+                                message=f'{count}/{len(items)} analiz tamamlandı')
+                    job_queue.check_cancelled(batch_id)
+            
+                results = call_gemini_batch([item['summary'] for item in items],
+                                            custom_prompt=custom_prompt,
+                                            pack_size=pack_size,
+                                            on_result=on_result,
+                                            should_cancel=lambda: job_queue.is_cancelled(batch_id))
+                job_queue.check_cancelled(batch_id)
+                jobs.update(batch_id, status='completed', progress=100, message='Toplu AI analizi tamamlandı!',
+                            result=[{'analysis_id': item['analysis_id'], 'ai_analysis': ai_result}
+                                    for item, ai_result in zip(items, results)])
+            except JobCancelled:
+                mark_cancelled(batch_id)
+                raise
+            except Exception as e:
+                jobs.update(batch_id, status='error', message=f'Toplu AI analizi hatası: {str(e)}')
+                print(f"[ERROR] Batch AI error: {traceback.format_exc()}")
+                raise
+    
+        if not job_queue.submit(batch_id, run_batch):
+            jobs.remove(batch_id)
+            return queue_full_response()
+    
+        return jsonify({
+            'success': True,
+            'batch_id': batch_id,
+            'total_items': len(items)
+        })
+        
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': f'Toplu AI analizi hatası: {str(e)}'
+        }), 500
+
+def batch_bad_request(message):
+    """Toplu analiz isteği için JSON 400 yanıtı"""
+    return jsonify({
+        'success': False,
+        'message': message
+    }), 400
+
+@app.route('/api/cancel/<analysis_id>', methods=['POST'])
+def api_cancel(analysis_id):
+    """Kuyruktaki veya çalışan analizi iptal et"""
+    job = jobs.get(analysis_id)
+    if job is None:
         return jsonify({
             'success': False,
             'message': 'Analiz bulunamadı'
         }), 404
     
+    # Birleştirilmiş analizde diğer istemciler hâlâ bekliyorsa işi durdurma
+    with inflight_lock:
+        subscribers = job.get('subscribers', 1)
+        if subscribers > 1 and job['status'] not in TERMINAL_STATUSES:
+            jobs.update(analysis_id, subscribers=subscribers - 1)
+            return jsonify({
+                'success': True,
+                'message': 'Analiz diğer istemciler için sürüyor'
+            })
+    
+    if not job_queue.cancel(analysis_id):
+        return jsonify({
+            'success': False,
+            'message': 'Analiz zaten tamamlandı',
+            'data': jobs.get(analysis_id)
+        }), 409
+    
+    # Kuyrukta bekleyen iş hiç başlamayacak; durumu hemen güncelle
+    if job['status'] == 'queued':
+        mark_cancelled(analysis_id)
+    else:
+        jobs.update(analysis_id, message='İptal ediliyor...')
+    
     return jsonify({
         'success': True,
-        'data': current_analysis[analysis_id]
+        'message': 'İptal isteği alındı'
     })
 
 @app.route('/api/files/<path:filename>')
@@ -239,36 +643,99 @@ def api_files(filename):
     """Output dosyalarını serve et"""
     return send_from_directory('output', filename)
 
+@app.route('/api/tiles/<layer>/<int:z>/<int:x>/<int:y>.png')
+def api_tiles(layer, z, x, y):
+    """Katman karosu (z/x/y, Web Mercator); ilk istekte üretilir, sonra diskten"""
+    analysis_id = request.args.get('analysis_id', '')
+    if layer not in tile_utils.TILE_LAYERS or not tile_utils.valid_tile(z, x, y):
+        return jsonify({'success': False, 'message': 'Geçersiz katman veya karo'}), 400
+    fields = load_fields(analysis_id)
+    if fields is None:
+        return jsonify({'success': False, 'message': 'Analiz alanları bulunamadı'}), 404
+    
+    response = Response(tile_utils.get_tile(analysis_id, fields, layer, z, x, y), mimetype='image/png')
+    # Analiz sonucu değişmez: tarayıcı karoyu tekrar istemez
+    response.headers['Cache-Control'] = 'public, max-age=86400, immutable'
+    return response
+
+@app.route('/api/fields/<analysis_id>')
+def api_fields_metadata(analysis_id):
+    """İkili alanların ızgara eksenleri, boyutları ve değer aralıkları"""
+    fields = load_fields(analysis_id)
+    if fields is None:
+        return jsonify({'success': False, 'message': 'Analiz alanları bulunamadı'}), 404
+    
+    return jsonify({'success': True, 'data': field_metadata(analysis_id, fields)})
+
+@app.route('/api/fields/<analysis_id>/<field>')
+def api_field_data(analysis_id, field):
+    """İşlenmiş alan, ham ikili (?encoding=uint8|float16|float32); Range ve gzip destekli"""
+    encoding = request.args.get('encoding', 'float16')
+    if encoding not in FIELD_ENCODINGS:
+        return jsonify({'success': False, 'message': f'Geçersiz kodlama: {encoding}'}), 400
+    fields = load_fields(analysis_id)
+    item = get_encoded_field(analysis_id, fields, field, encoding) if fields is not None else None
+    if item is None:
+        return jsonify({'success': False, 'message': 'Alan bulunamadı'}), 404
+    data, compressed, info = item
+    
+    # Aralık istekleri sıkıştırılmamış gövdenin baytlarına uygulanır; tam gövde istemci kabul ederse gzip
+    use_gzip = 'Range' not in request.headers and 'gzip' in request.headers.get('Accept-Encoding', '')
+    response = Response(compressed if use_gzip else data, mimetype='application/octet-stream')
+    response.headers['X-Field-Shape'] = ','.join(str(n) for n in info['shape'])
+    response.headers['X-Field-Dtype'] = info['dtype']
+    response.headers['X-Field-Scale'] = repr(info['scale'])
+    response.headers['X-Field-Offset'] = repr(info['offset'])
+    response.headers['X-Field-Nodata'] = str(info['nodata'])
+    response.headers['Access-Control-Expose-Headers'] = 'X-Field-Shape, X-Field-Dtype, X-Field-Scale, X-Field-Offset, X-Field-Nodata, Content-Range'
+    response.headers['Cache-Control'] = 'public, max-age=86400'
+    response.vary.add('Accept-Encoding')
+    if use_gzip:
+        response.headers['Content-Encoding'] = 'gzip'
+    response.set_etag(f"{analysis_id}-{field}-{encoding}{'-gz' if use_gzip else ''}")
+    return response.make_conditional(request, accept_ranges=True, complete_length=len(data))
+
+def parse_timestamp(value):
+    """Epoch saniye veya ISO tarih/saat -> epoch saniye"""
+    if value is None or value == '':
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        return datetime.fromisoformat(value).timestamp()
+
 @app.route('/api/history')
 def api_history():
-    """Geçmiş analizleri listele"""
+    """Geçmiş analizleri listele (indeksten, sayfalı)
+    
+    Parametreler: page, per_page, start/end (analiz dönemi, YYYY-MM-DD),
+    since/until (oluşturulma zamanı, epoch veya ISO)
+    """
     try:
-        files = []
-        output_dir = 'output'
-        if os.path.exists(output_dir):
-            for filename in os.listdir(output_dir):
-                if filename.startswith('analysis_') and filename.endswith('.json'):
-                    filepath = os.path.join(output_dir, filename)
-                    try:
-                        with open(filepath, 'r', encoding='utf-8') as f:
-                            data = json.load(f)
-                            files.append({
-                                'filename': filename,
-                                'dates': data.get('dates'),
-                                'created': os.path.getctime(filepath),
-                                'url': f'/api/files/{filename}'
-                            })
-                    except:
-                        continue
-        
-        # Tarihe göre sırala (en yeni önce)
-        files.sort(key=lambda x: x['created'], reverse=True)
+        page = max(1, request.args.get('page', 1, type=int))
+        per_page = min(500, max(1, request.args.get('per_page', 50, type=int)))
+        files, total = history.query(
+            start=request.args.get('start') or None,
+            end=request.args.get('end') or None,
+            since=parse_timestamp(request.args.get('since')),
+            until=parse_timestamp(request.args.get('until')),
+            limit=per_page,
+            offset=(page - 1) * per_page
+        )
         
         return jsonify({
             'success': True,
-            'files': files
+            'files': files,
+            'page': page,
+            'per_page': per_page,
+            'total': total
         })
         
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'message': f'Geçersiz parametre: {str(e)}'
+        }), 400
     except Exception as e:
         return jsonify({
             'success': False,
@@ -278,8 +745,6 @@ def api_history():
 @app.route('/api/personalized-prediction', methods=['POST'])
 def api_personalized_prediction():
     """Personalized weather prediction with user profile"""
-    global current_analysis
-    
     try:
         data = request.get_json()
         start_date = data.get('startDate')
@@ -300,60 +765,54 @@ def api_personalized_prediction():
             }), 401
         
         # Generate unique analysis ID
-        analysis_id = f"prediction_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+        analysis_id = new_job_id('prediction')
         
         # Initialize progress tracking
-        current_analysis[analysis_id] = {
-            'status': 'starting',
+        jobs.create(analysis_id, **{
+            'status': 'queued',
             'progress': 0,
-            'message': 'Initializing personalized prediction...',
+            'message': 'Personalized prediction queued...',
             'user_profile': user_profile,
             'start_date': start_date,
             'end_date': end_date,
             'custom_query': custom_query
-        }
+        })
         
         # Start prediction in background thread
         def run_personalized_prediction():
             try:
-                current_analysis[analysis_id]['status'] = 'running'
-                current_analysis[analysis_id]['progress'] = 10
-                current_analysis[analysis_id]['message'] = 'Fetching future weather data...'
+                jobs.update(analysis_id, status='running', progress=10, message='Fetching future weather data...')
                 
                 # For future predictions, we'll use historical patterns and trends
                 # This is a simplified approach - in a real system you'd use proper forecasting models
                 
                 # Step 1: Fetch recent historical data for pattern analysis
-                current_analysis[analysis_id]['progress'] = 30
-                current_analysis[analysis_id]['message'] = 'Analyzing weather patterns...'
+                jobs.update(analysis_id, progress=30, message='Analyzing weather patterns...')
                 
                 # Use recent data to establish patterns
                 import datetime as dt
-                recent_start = (dt.datetime.strptime(start_date, '%Y-%m-%d') - dt.timedelta(days=365)).strftime('%Y-%m-%d')
+                recent_start = (dt.datetime.strptime(start_date, '%Y-%m-%d') - dt.timedelta(days=PREDICTION_LOOKBACK_DAYS)).strftime('%Y-%m-%d')
                 recent_end = (dt.datetime.strptime(start_date, '%Y-%m-%d') - dt.timedelta(days=1)).strftime('%Y-%m-%d')
                 
-                datasets = fetch_weather_data(dates=(recent_start, recent_end))
-                variables = extract_variables(datasets)
-                processed_data = process_variables(variables)
+                processed_data, _ = fetch_and_process(dates=(recent_start, recent_end))
+                job_queue.check_cancelled(analysis_id)
                 
                 # Step 2: Create base forecast summary
-                current_analysis[analysis_id]['progress'] = 50
-                current_analysis[analysis_id]['message'] = 'Creating base forecast...'
+                jobs.update(analysis_id, progress=50, message='Creating base forecast...')
                 
                 base_summary = create_summary(processed_data, (start_date, end_date))
                 
                 # Step 3: Generate personalized AI analysis
-                current_analysis[analysis_id]['progress'] = 70
-                current_analysis[analysis_id]['message'] = 'Generating personalized insights...'
+                jobs.update(analysis_id, progress=70, message='Generating personalized insights...')
                 
                 # Create personalized prompt based on user profile
                 personalized_prompt = create_personalized_prompt(user_profile, base_summary, custom_query, (start_date, end_date))
                 
                 ai_response = call_gemini_analysis(base_summary, custom_prompt=personalized_prompt)
+                job_queue.check_cancelled(analysis_id)
                 
                 # Step 4: Format personalized output
-                current_analysis[analysis_id]['progress'] = 90
-                current_analysis[analysis_id]['message'] = 'Finalizing personalized prediction...'
+                jobs.update(analysis_id, progress=90, message='Finalizing personalized prediction...')
                 
                 formatted_output = format_personalized_analysis(ai_response, base_summary, user_profile, (start_date, end_date))
                 
@@ -362,20 +821,20 @@ def api_personalized_prediction():
                 with open(save_path, 'w', encoding='utf-8') as f:
                     json.dump(formatted_output, f, ensure_ascii=False, indent=2)
                 
-                current_analysis[analysis_id]['status'] = 'completed'
-                current_analysis[analysis_id]['progress'] = 100
-                current_analysis[analysis_id]['message'] = 'Personalized prediction complete!'
-                current_analysis[analysis_id]['result'] = formatted_output
+                jobs.update(analysis_id, status='completed', progress=100, message='Personalized prediction complete!', result=formatted_output)
                 
+            except JobCancelled:
+                mark_cancelled(analysis_id)
+                raise
             except Exception as e:
-                current_analysis[analysis_id]['status'] = 'error'
-                current_analysis[analysis_id]['message'] = f'Prediction error: {str(e)}'
+                jobs.update(analysis_id, status='error', message=f'Prediction error: {str(e)}')
                 print(f"Personalized prediction error: {traceback.format_exc()}")
+                raise
         
-        # Start background thread
-        thread = threading.Thread(target=run_personalized_prediction)
-        thread.daemon = True
-        thread.start()
+        # Run on the bounded worker pool; 429 when the queue is full
+        if not job_queue.submit(analysis_id, run_personalized_prediction):
+            jobs.remove(analysis_id)
+            return queue_full_response()
         
         return jsonify({
             'success': True,
@@ -393,7 +852,8 @@ def api_personalized_prediction():
 def api_prediction_progress(analysis_id):
     """Get personalized prediction progress"""
     try:
-        if analysis_id not in current_analysis:
+        job = jobs.get(analysis_id)
+        if job is None:
             return jsonify({
                 'success': False,
                 'message': 'Analysis not found'
@@ -401,7 +861,7 @@ def api_prediction_progress(analysis_id):
         
         return jsonify({
             'success': True,
-            'data': current_analysis[analysis_id]
+            'data': job
         })
         
     except Exception as e:
@@ -410,6 +870,16 @@ def api_prediction_progress(analysis_id):
             'message': f'Progress check error: {str(e)}'
         }), 500
 
+@app.route('/api/prediction-progress/<analysis_id>/stream')
+def api_prediction_progress_stream(analysis_id):
+    """Personalized prediction progress (Server-Sent Events)"""
+    if jobs.get(analysis_id) is None:
+        return jsonify({
+            'success': False,
+            'message': 'Analysis not found'
+        }), 404
+    return progress_event_stream(analysis_id)
+
 def create_personalized_prompt(user_profile, base_summary, custom_query, dates):
     """Create a personalized prompt based on user profile"""
     
@@ -527,4 +997,8 @@ if __name__ == '__main__':
     print("🌐 Web arayüzü: http://localhost:5000")
     print("📡 API endpoint: http://localhost:5000/api")
     
+    # Reloader'ın izleyici sürecinde değil, sadece sunucu sürecinde ısıt
+    if os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        render_pool.start_render_pool()
+    
     app.run(debug=True, host='0.0.0.0', port=5000)
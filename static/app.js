@@ -5,6 +5,7 @@ class WeatherApp {
     constructor() {
         this.currentAnalysisId = null;
         this.progressTimer = null;
+        this.progressStream = null;
         this.init();
     }
 
@@ -127,7 +128,12 @@ class WeatherApp {
 
             const data = await response.json();
 
-            if (data.success) {
+            if (data.success && data.cached) {
+                // Önbellekten: arka plan işi yok, sonuç hemen hazır
+                this.currentAnalysisId = data.analysis_id;
+                this.updateProgress(100, data.message);
+                this.handleAnalysisComplete(data.result);
+            } else if (data.success) {
                 this.currentAnalysisId = data.analysis_id;
                 this.showMessage('Analiz başlatıldı! İlerleme takip ediliyor...', 'info');
                 this.startProgressTracking();
@@ -158,13 +164,54 @@ class WeatherApp {
         }
     }
 
-    // Progress takibini başlat
+    // Progress takibini başlat (SSE, desteklenmiyorsa polling)
     startProgressTracking() {
+        if (window.EventSource) {
+            this.startProgressStream();
+            return;
+        }
         this.progressTimer = setInterval(() => {
             this.checkProgress();
         }, 2000);
     }
 
+    // SSE ile sadece değişen alanları al
+    startProgressStream() {
+        const progress = {};
+        this.progressStream = new EventSource(`/api/progress/${this.currentAnalysisId}/stream`);
+
+        this.progressStream.onmessage = (event) => {
+            Object.assign(progress, JSON.parse(event.data));
+            this.updateProgress(progress.progress, progress.message);
+            if (progress.partial && progress.partial.ai_text) {
+                this.displayAIPartial(progress.partial.ai_text);
+            }
+
+            if (progress.status === 'completed') {
+                this.handleAnalysisComplete(progress.result);
+            } else if (progress.status === 'error' || progress.status === 'cancelled') {
+                this.handleAnalysisError(progress.message);
+            }
+        };
+        this.progressStream.addEventListener('end', () => this.stopProgressTracking());
+        this.progressStream.onerror = () => {
+            // Bağlantı koptu: polling'e geri dön
+            this.stopProgressTracking();
+            this.progressTimer = setInterval(() => {
+                this.checkProgress();
+            }, 2000);
+        };
+    }
+
+    // Progress takibini durdur
+    stopProgressTracking() {
+        clearInterval(this.progressTimer);
+        if (this.progressStream) {
+            this.progressStream.close();
+            this.progressStream = null;
+        }
+    }
+
     // Progress durumunu kontrol et
     async checkProgress() {
         if (!this.currentAnalysisId) return;
@@ -179,7 +226,7 @@ class WeatherApp {
 
                 if (progress.status === 'completed') {
                     this.handleAnalysisComplete(progress.result);
-                } else if (progress.status === 'error') {
+                } else if (progress.status === 'error' || progress.status === 'cancelled') {
                     this.handleAnalysisError(progress.message);
                 }
             }
@@ -200,7 +247,7 @@ class WeatherApp {
 
     // Analiz tamamlandığında
     handleAnalysisComplete(result) {
-        clearInterval(this.progressTimer);
+        this.stopProgressTracking();
         this.showMessage('Analiz başarıyla tamamlandı! 🎉', 'success');
         
         this.displayResults(result);
@@ -210,7 +257,7 @@ class WeatherApp {
 
     // Analiz hata durumunda
     handleAnalysisError(message) {
-        clearInterval(this.progressTimer);
+        this.stopProgressTracking();
         this.showMessage(`Analiz hatası: ${message}`, 'error');
         this.resetForm();
     }
@@ -312,6 +359,15 @@ class WeatherApp {
         container.style.display = 'block';
     }
 
+    // Analiz sürerken gelen kısmi AI metnini göster (tamamlanınca displayAIAnalysis ile değişir)
+    displayAIPartial(text) {
+        const pre = document.createElement('pre');
+        pre.textContent = text;
+        document.getElementById('aiContent').replaceChildren(pre);
+        document.getElementById('resultsSection').classList.add('show');
+        document.getElementById('aiAnalysis').style.display = 'block';
+    }
+
     // Geçmiş analizleri yükle
     async loadHistory() {
         try {
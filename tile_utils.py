@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+"""
+Tile Utilities
+İşlenmiş katmanlardan Web Mercator z/x/y PNG karoları (ilk istekte üretilir, diskte önbelleklenir)
+
+Karo başına sadece görünen alan örneklenir; pyplot/cartopy kullanılmaz (iş parçacığı güvenli).
+"""
+
+import io
+import math
+import os
+
+import numpy as np
+from matplotlib import colormaps
+from matplotlib.colors import Normalize
+from matplotlib.image import imsave
+
+from cache_utils import DiskLRUCache, cache_key
+
+TILE_SIZE = 256
+# MERRA-2 ızgarası ~0.5°: daha yüksek zoom'lar en yakın komşu büyütmesi, yeni ayrıntı yok
+TILE_MAX_ZOOM = int(os.getenv('TILE_MAX_ZOOM', '8'))
+TILE_DIR = os.getenv('TILE_DIR', os.path.join('output', 'tiles'))
+TILE_CACHE_MAX_BYTES = int(float(os.getenv('TILE_CACHE_MAX_MB', '512')) * 1024 ** 2)
+tile_cache = DiskLRUCache(TILE_DIR, TILE_CACHE_MAX_BYTES, suffix='.png')
+MERCATOR_MAX_LAT = 85.0511287798
+
+# Katman adı -> (alan, renk haritası, sabit aralık); aralık sabit ki karolar zoom'lar arasında tutarlı olsun
+TILE_LAYERS = {
+    'precipitation': ('precipitation_mm_day', 'Blues', (0.0, 20.0)),
+    'drought': ('drought_index', 'Reds', (0.0, 1.0)),
+    'temperature': ('temperature_c', 'RdYlBu_r', (-20.0, 45.0)),
+    'aod': ('aerosol', 'YlGnBu_r', (0.0, 1.0)),
+}
+
+def _encode_png(rgba):
+    buf = io.BytesIO()
+    imsave(buf, rgba, format='png')
+    return buf.getvalue()
+
+EMPTY_TILE = _encode_png(np.zeros((TILE_SIZE, TILE_SIZE, 4), dtype=np.uint8))
+
+def valid_tile(z, x, y):
+    """Zoom sınırı ve karo indeksi kontrolü"""
+    n = 1 << z
+    return 0 <= z <= TILE_MAX_ZOOM and 0 <= x < n and 0 <= y < n
+
+def tile_bounds(z, x, y):
+    """Karonun (batı, güney, doğu, kuzey) sınırları, derece"""
+    n = 1 << z
+    lat = lambda row: math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * row / n))))
+    return x / n * 360.0 - 180.0, lat(y + 1), (x + 1) / n * 360.0 - 180.0, lat(y)
+
+def _pixel_centers(z, x, y):
+    """Karo piksel merkezlerinin boylamları (sütun) ve enlemleri (satır, kuzeyden güneye)"""
+    n = 1 << z
+    t = (np.arange(TILE_SIZE) + 0.5) / TILE_SIZE
+    lons = (x + t) / n * 360.0 - 180.0
+    lats = np.degrees(np.arctan(np.sinh(np.pi * (1 - 2 * (y + t) / n))))
+    return lons, lats
+
+def _grid_index(axis, values):
+    """Düzenli ızgarada en yakın hücre indeksi; ızgara dışı -1"""
+    if axis.size == 1:
+        step = 1.0
+    else:
+        step = (axis[-1] - axis[0]) / (axis.size - 1)
+    idx = np.rint((values - axis[0]) / step).astype(np.int64)
+    idx[(idx < 0) | (idx >= axis.size)] = -1
+    return idx
+
+def render_tile(fields, layer, z, x, y):
+    """Katmanın z/x/y karosunu PNG bayt olarak üret (veri dışındaki pikseller saydam)"""
+    field, cmap, (vmin, vmax) = TILE_LAYERS[layer]
+    values = fields.get(field)
+    if values is None:
+        return EMPTY_TILE
+    lat, lon = fields['lat'], fields['lon']
+    _, south, _, north = tile_bounds(z, x, y)
+    if south > lat.max() or north < lat.min():
+        return EMPTY_TILE
+
+    lons, lats = _pixel_centers(z, x, y)
+    # Veri boylamı lon_min'den başlayan 360° pencerede (antimeridyen geçen bbox'lar için)
+    lon_min = float(lon.min())
+    col = _grid_index(lon, lon_min + (lons - lon_min) % 360.0)
+    row = _grid_index(lat, lats)
+    if (col < 0).all() or (row < 0).all():
+        return EMPTY_TILE
+    sample = values[np.ix_(np.maximum(row, 0), np.maximum(col, 0))]
+    mask = (row[:, None] < 0) | (col[None, :] < 0) | ~np.isfinite(sample)
+
+    rgba = colormaps[cmap](Normalize(vmin, vmax, clip=True)(np.where(mask, vmin, sample)), bytes=True)
+    rgba[mask] = 0
+    return _encode_png(rgba)
+
+def tile_key(analysis_id, layer, z, x, y):
+    """Karonun disk önbelleği anahtarı"""
+    return cache_key(analysis_id, layer, z, x, y)
+
+def get_tile(analysis_id, fields, layer, z, x, y):
+    """Önbellekteki karoyu döndür, yoksa üretip kaydet (boş karolar diske yazılmaz; LRU, boyut sınırlı)"""
+    key = tile_key(analysis_id, layer, z, x, y)
+    path = tile_cache.get(key)
+    if path is not None:
+        try:
+            with open(path, 'rb') as f:
+                return f.read()
+        except OSError:  # Bu arada tahliye edildi
+            pass
+    data = render_tile(fields, layer, z, x, y)
+    if data is not EMPTY_TILE:
+        tile_cache.put_stream(key, io.BytesIO(data))
+    return data
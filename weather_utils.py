@@ -6,16 +6,29 @@ Meteorolojik veri analizi için yardımcı fonksiyonlar
 
 import os
 import sys
+import time
+import atexit
+import threading
 import traceback
+import weakref
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
 from datetime import datetime
 import json
 
 import numpy as np
+import pandas as pd
 import xarray as xr
+import h5netcdf
+from xarray.backends import CachingFileManager, H5NetCDFStore
+from xarray.backends.lru_cache import LRUCache
 import matplotlib.pyplot as plt
 import cartopy.crs as ccrs
 import cartopy.feature as cfeature
 
+from cache_utils import DiskLRUCache, JsonDiskCache, TTLCache, cache_key
+from climatology_utils import climatology_drought_index
+from daily_store import DAILY_STORE, DAILY_STORE_DIR, DailyStore
+
 try:
     import earthaccess
 except Exception:
@@ -28,6 +41,56 @@ DATES = ("2025-09-01", "2025-10-02")
 TIME_INDEX = 0
 OUTPUT_DIR = "output"
 
+# Kuraklık indeksi çekirdeği: paralel blok sayısı ve paralelleştirme eşiği (eleman)
+DROUGHT_WORKERS = min(8, os.cpu_count() or 1)
+DROUGHT_PARALLEL_MIN_SIZE = 1 << 18
+
+# Zaman serisi modu: True ise tüm tarih aralığı akış halinde özetlenir (TIME_INDEX kullanılmaz)
+AGGREGATE_TIME = True
+TIME_CHUNK = 24  # Akış bloğu (zaman adımı)
+PERCENTILES = (10, 50, 90)
+# Yüzdelik histogramları için sabit kutular: (alt, üst, kutu sayısı)
+HIST_RANGES = {
+    'temperature_c': (-60.0, 60.0, 2400),
+    'precipitation_mm_day': (0.0, 500.0, 10000),
+    'wind_speed': (0.0, 80.0, 1600),
+    'soil_moisture': (0.0, 1.0, 1000),
+    'aerosol': (0.0, 5.0, 5000),
+}
+
+# Çoklu granül okuma ayarları
+MULTI_GRANULE = True  # False: eski davranış, sadece ilk granül açılır
+# Paralel açılış sayısı ve açık tanıtıcı üst sınırı (LRU; tahliye edilen dosya gerektiğinde yeniden açılır).
+# Yerel yollar xarray dosya önbelleğinde, uzak granüller (URL + fsspec HTTPS oturumu) ayrı önbellekte tutulur.
+MAX_OPEN_FILES = 8
+GRANULE_CHUNKS = {'time': 24}  # Dask chunk boyutu (M2T1: granül başına 24 saat)
+xr.set_options(file_cache_maxsize=max(1, MAX_OPEN_FILES))  # Süreç genelinde bir kez
+REMOTE_BLOCK_SIZE = 4 * 1024 * 1024  # Uzak okumalarda fsspec blok önbelleği
+
+# Yerel granül önbelleği (0 GB = kapalı)
+GRANULE_CACHE_DIR = os.getenv('GRANULE_CACHE_DIR', os.path.join(OUTPUT_DIR, 'granule_cache'))
+GRANULE_CACHE_MAX_BYTES = int(float(os.getenv('GRANULE_CACHE_MAX_GB', '20')) * 1024 ** 3)
+granule_cache = DiskLRUCache(GRANULE_CACHE_DIR, GRANULE_CACHE_MAX_BYTES, suffix='.nc4')
+
+# Veri setleri: anahtar -> (short_name, fail_on_empty)
+COLLECTIONS = {
+    'atmospheric': ("M2T1NXSLV", True),
+    'flux': ("M2T1NXFLX", False),
+    'land': ("M2T1NXLND", False),
+    'aerosol': ("M2T1NXAER", False),
+}
+# CMR arama sonuç önbelleği (bellek + disk)
+SEARCH_CACHE_TTL = float(os.getenv('SEARCH_CACHE_TTL', str(6 * 3600)))  # saniye, 0 = süresiz
+SEARCH_CACHE_DIR = os.getenv('SEARCH_CACHE_DIR', os.path.join(OUTPUT_DIR, 'search_cache'))
+SEARCH_CACHE_MAX_BYTES = int(float(os.getenv('SEARCH_CACHE_MAX_MB', '64')) * 1024 ** 2)
+search_memory_cache = TTLCache(max_entries=512, ttl=SEARCH_CACHE_TTL)
+search_disk_cache = JsonDiskCache(SEARCH_CACHE_DIR, ttl=SEARCH_CACHE_TTL, max_bytes=SEARCH_CACHE_MAX_BYTES)
+
+FETCH_TIMEOUT = float(os.getenv('FETCH_TIMEOUT', '300'))  # Koleksiyon başına saniye
+
+# Gün başına işlenmiş istatistikler (toplu mod): histogram aralıkları değişirse eski günler geçersiz
+daily_store = DailyStore(DAILY_STORE_DIR, version=f"v1:{sorted(HIST_RANGES.items())}")
+
 def ensure_output_dir():
     """Output klasörünü oluştur"""
     os.makedirs(OUTPUT_DIR, exist_ok=True)
@@ -36,6 +99,7 @@ def login_earthaccess():
     """EarthAccess'e giriş yap (bir kez yapılır)"""
     try:
         earthaccess.login()
+        _https_session.clear()
         print("[INFO] EarthAccess login başarılı")
         return True
     except Exception as e:
@@ -52,25 +116,208 @@ def login_earthaccess_with_credentials(username, password):
         
         # Try to login with provided credentials
         earthaccess.login()
+        _https_session.clear()
         print("[INFO] EarthAccess login başarılı (credentials)")
         return True
     except Exception as e:
         print(f"[ERROR] EarthAccess credentials login hatası: {e}")
         return False
 
-def search_and_open(short_name, dates=DATES, bbox=BBOX, fail_on_empty=True):
-    """NASA veri setini ara ve aç"""
-    print(f"[INFO] Searching {short_name} for {dates} @ bbox={bbox} ...")
+# Uzak granül tanıtıcıları: en fazla MAX_OPEN_FILES açık, çıkışta kapatılır (h5py kapanış sırası çökmesin)
+_remote_files = LRUCache(maxsize=max(1, MAX_OPEN_FILES), on_evict=lambda key, f: f.close())
+_https_session = {}
+_https_session_lock = threading.Lock()
+
+@atexit.register
+def _close_remote_files():
+    for key in list(_remote_files):
+        _remote_files.pop(key).close()
+
+def https_filesystem():
+    """Kimlik doğrulamalı fsspec HTTPS oturumu (login sonrası ilk kullanımda oluşturulur)"""
+    with _https_session_lock:
+        fs = _https_session.get('fs')
+        if fs is None:
+            fs = _https_session['fs'] = earthaccess.get_fsspec_https_session()
+        return fs
+
+class RemoteGranuleFile(h5netcdf.File):
+    """URL'den açılan h5netcdf dosyası; close() alttaki HTTPS dosyasını da kapatır"""
+
+    def __init__(self, url, mode='r', **kwargs):
+        self._remote = https_filesystem().open(url, 'rb', cache_type='blockcache', block_size=REMOTE_BLOCK_SIZE)
+        try:
+            super().__init__(self._remote, mode, **kwargs)
+        except BaseException:
+            self._remote.close()
+            raise
+
+    def close(self):
+        try:
+            super().close()
+        finally:
+            self._remote.close()
+
+def is_remote(f):
+    """Granül yolu uzak URL mi"""
+    return isinstance(f, str) and '://' in f
+
+def open_granules(files, chunks=GRANULE_CHUNKS, max_open_files=MAX_OPEN_FILES):
+    """Granül dosyalarını tembel (lazy) açıp zaman ekseninde birleştir
+
+    files: yerel yollar ve/veya uzak URL'ler. Açık tanıtıcılar her iki tür için de LRU önbelleklerle
+    sınırlıdır (yerel: xarray dosya önbelleği, uzak: _remote_files); max_open_files paralel açılışı sınırlar.
+    """
+    if not files:
+        raise RuntimeError("open_granules: no files to open")
+
+    def _open(f):
+        if is_remote(f):
+            manager = CachingFileManager(RemoteGranuleFile, f, mode='r', cache=_remote_files)
+            return xr.open_dataset(H5NetCDFStore(manager), chunks=chunks)
+        return xr.open_dataset(f, chunks=chunks)
+
+    with ThreadPoolExecutor(max_workers=max(1, max_open_files)) as pool:
+        parts = list(pool.map(_open, files))
+
+    if len(parts) == 1:
+        return parts[0]
+    ds = xr.concat(parts, dim='time', data_vars='minimal', coords='minimal', compat='override',
+                   join='override', combine_attrs='override')
+    return ds.sortby('time')
+
+def granule_id(granule):
+    """earthaccess granül kaydından kimlik al"""
+    try:
+        return granule['meta']['native-id']
+    except (KeyError, TypeError):
+        pass
+    try:
+        return granule['umm']['GranuleUR']
+    except (KeyError, TypeError):
+        pass
+    return os.path.basename(granule.data_links()[0])
+
+def granule_url(granule):
+    """Granülün HTTPS veri bağlantısı (M2T1: granül başına tek dosya)"""
+    return granule.data_links()[0]
+
+def granule_bytes(granule):
+    """CMR meta verisindeki granül boyutu (bayt); bilinmiyorsa None"""
+    try:
+        size = float(granule.size())  # earthaccess: MB
+    except Exception:
+        return None
+    return int(size * 1024 ** 2) if size > 0 else None
+
+def open_cached_granules(short_name, results, use_cache=True):
+    """Granülleri yerel önbellekten ver, eksikleri indirip önbelleğe yaz; (dosyalar, kiralı yollar)
+
+    Dönen yollar tahliyeye karşı kiralıdır, iş bitince granule_cache.unpin ile bırakılmalı.
+    Eksikler önbelleğe sığmıyorsa (veya use_cache=False) indirilmez, URL olarak döner (tembel uzak okuma).
+    """
+    if granule_cache.max_bytes <= 0 or not use_cache:
+        return [granule_url(g) for g in results], []
+
+    keys = [cache_key(short_name, granule_id(g)) for g in results]
+    paths = [granule_cache.get(k, pin=True) for k in keys]
+    pinned = [p for p in paths if p is not None]
+    missing = [i for i, p in enumerate(paths) if p is None]
+    print(f"[CACHE] {short_name}: {len(pinned)} hit, {len(missing)} miss")
+    if not missing:
+        return paths, pinned
+
+    sizes = [granule_bytes(results[i]) for i in missing]
+    if None in sizes or sum(sizes) > granule_cache.available_bytes():
+        print(f"[CACHE] {short_name}: {len(missing)} granül önbelleğe sığmıyor/boyutu bilinmiyor, uzaktan okunacak")
+        for i in missing:
+            paths[i] = granule_url(results[i])
+        return paths, pinned
+    try:
+        files = earthaccess.open([results[i] for i in missing])
+        if not files or len(files) != len(missing):
+            raise RuntimeError(f"earthaccess.open returned {len(files or [])} file objects for {len(missing)} {short_name} granules")
+
+        def _download(item):
+            i, f = item
+            try:
+                return i, granule_cache.put_stream(keys[i], f, pin=True)
+            finally:
+                f.close()
+
+        with ThreadPoolExecutor(max_workers=max(1, MAX_OPEN_FILES)) as pool:
+            for i, path in pool.map(_download, zip(missing, files)):
+                paths[i] = path
+                pinned.append(path)
+    except BaseException:
+        granule_cache.unpin(pinned)
+        raise
+    return paths, pinned
+
+def normalize_search_query(short_name, dates, bbox):
+    """CMR sorgusunu önbellek anahtarı için normalize et"""
+    norm_dates = []
+    for d in dates:
+        try:
+            norm_dates.append(datetime.fromisoformat(str(d).strip()).isoformat())
+        except ValueError:
+            norm_dates.append(str(d).strip())
+    norm_bbox = tuple(round(float(v), 4) for v in bbox)
+    return (short_name.strip().upper(), tuple(norm_dates), norm_bbox)
+
+def search_data_cached(short_name, dates=DATES, bbox=BBOX):
+    """earthaccess.search_data sonuçlarını TTL ile önbellekten ver"""
+    key = cache_key(*normalize_search_query(short_name, dates, bbox))
+    results = search_memory_cache.get(key)
+    if results is not None:
+        print(f"[CACHE] CMR search hit (memory): {short_name}")
+        return results
+    
+    item = search_disk_cache.get(key)
+    if item is not None:
+        try:
+            from earthaccess.results import DataGranule
+            created, raw = item
+            results = [DataGranule(g, cloud_hosted=True) for g in raw]
+            search_memory_cache.set(key, results, created=created)
+            print(f"[CACHE] CMR search hit (disk): {short_name}")
+            return results
+        except Exception as e:
+            print(f"[WARN] CMR search cache okunamadı: {e}")
+    
     results = earthaccess.search_data(short_name=short_name, temporal=dates, bounding_box=bbox, cloud_hosted=True)
+    # Boş sonuçları önbelleğe alma: veri henüz yayımlanmamış olabilir
+    if results:
+        search_memory_cache.set(key, results)
+        try:
+            search_disk_cache.set(key, [dict(g) for g in results])
+        except Exception as e:
+            print(f"[WARN] CMR search cache yazılamadı: {e}")
+    return results
+
+def search_and_open(short_name, dates=DATES, bbox=BBOX, fail_on_empty=True, multi_granule=MULTI_GRANULE,
+                    use_cache=True):
+    """NASA veri setini ara ve aç (use_cache=False: granüller indirilmez, tembel uzak okuma)"""
+    print(f"[INFO] Searching {short_name} for {dates} @ bbox={bbox} ...")
+    results = search_data_cached(short_name, dates=dates, bbox=bbox)
     if not results:
         if fail_on_empty:
             raise RuntimeError(f"No results for {short_name} {dates} {bbox}")
         return None
-    files = earthaccess.open(results[0:1])
-    if not files:
-        raise RuntimeError(f"earthaccess.open returned no file objects for {short_name}")
-    ds = xr.open_dataset(files[0])
-    print(f"[INFO] Opened dataset {short_name}. Variables: {list(ds.variables.keys())[:10]} ...")
+    if not multi_granule:
+        results = results[0:1]
+    files, pinned = open_cached_granules(short_name, results, use_cache=use_cache)
+    try:
+        if not files:
+            raise RuntimeError(f"No granule files for {short_name}")
+        ds = open_granules(files)
+    except BaseException:
+        granule_cache.unpin(pinned)
+        raise
+    # Önbellek dosyaları veri seti yaşadıkça kiralı (tembel okumalar ve xarray dosya önbelleği yeniden açabilir)
+    if pinned:
+        weakref.finalize(ds, granule_cache.unpin, pinned)
+    print(f"[INFO] Opened dataset {short_name} ({len(files)} granules). Variables: {list(ds.variables.keys())[:10]} ...")
     return ds
 
 def safe_var(ds, names):
@@ -80,94 +327,450 @@ def safe_var(ds, names):
             return ds[n]
     raise KeyError(f"None of {names} found. Available: {list(ds.variables.keys())[:20]}")
 
+def native_lon_slices(lon_values, lon_min, lon_max):
+    """Bbox boylamlarını veri setinin kendi (0..360 / -180..180) aralığına çevir"""
+    if float(np.nanmax(lon_values)) > 180:
+        a, b = lon_min % 360, lon_max % 360
+        if lon_max - lon_min >= 360:
+            a, b = 0.0, 360.0
+    else:
+        a, b = ((lon_min + 180) % 360) - 180, ((lon_max + 180) % 360) - 180
+        if lon_max - lon_min >= 360:
+            a, b = -180.0, 180.0
+        elif lon_max == 180:
+            b = 180.0
+    if a <= b:
+        return [slice(a, b)]
+    # Antimeridyen (veya 0° meridyeni) kesişimi: iki parça
+    return [slice(a, None), slice(None, b)]
+
 def subset_time_space(da, time_index=TIME_INDEX, bbox=BBOX):
-    """Veriyi zaman ve mekan olarak alt kümeye ayır"""
+    """Veriyi zaman ve mekan olarak alt kümeye ayır (önce seçim, sonra boylam düzeltme)"""
     lon_min, lat_min, lon_max, lat_max = bbox
-    if 'lon' in da.coords:
-        lon = da.coords['lon']
-        try:
-            if float(lon.max()) > 180:
-                da = da.assign_coords(lon=(((da.lon + 180) % 360) - 180)).sortby('lon')
-        except Exception:
-            pass
-    if 'time' in da.dims:
+    # Önce zaman: tüm küp yerine tek adım (time_index=None ise tüm adımlar)
+    if 'time' in da.dims and time_index is not None:
         da = da.isel(time=time_index)
-    return da.sel(lon=slice(lon_min, lon_max), lat=slice(lat_min, lat_max))
+    if 'lat' in da.coords:
+        da = da.sel(lat=slice(lat_min, lat_max))
+    if 'lon' not in da.coords:
+        return da
+    
+    # Sonra bbox'ı verinin kendi boylam indeksine göre kes
+    pieces = [da.sel(lon=s) for s in native_lon_slices(da.lon.values, lon_min, lon_max)]
+    da = pieces[0] if len(pieces) == 1 else xr.concat(pieces, dim='lon')
+    
+    # Sadece küçük alt kümede boylamı bbox çerçevesine taşı (lon_min..lon_min+360)
+    lon = da.lon.values
+    new_lon = lon_min + ((lon - lon_min) % 360)
+    if not np.array_equal(lon, new_lon):
+        da = da.assign_coords(lon=new_lon)
+    # Tam küre kutularında tek parça, lon_min'in yerel konumunda bölünür: artan eksen için döndür
+    if new_lon.size > 1 and not (np.diff(new_lon) > 0).all():
+        split = int(np.argmin(new_lon))
+        da = da.isel(lon=np.r_[split:new_lon.size, 0:split])
+    return da
 
-def fetch_weather_data(dates=DATES):
-    """Tüm hava durumu verilerini çek"""
-    print("[STEP] Fetching datasets...")
+def run_collections(task, timeout=FETCH_TIMEOUT):
+    """task(key, short_name, fail_on_empty) her koleksiyon için eşzamanlı; ({key: sonuç}, {short_name: süre})
+
+    Zorunlu koleksiyonun hatası/zaman aşımı yükseltilir, isteğe bağlılar None olur.
+    """
+    def _run(key, short_name, fail_on_empty):
+        t0 = time.perf_counter()
+        result = task(key, short_name, fail_on_empty)
+        return result, time.perf_counter() - t0
     
-    # Ana meteoroloji verileri
-    ds_atm = search_and_open("M2T1NXSLV", dates=dates)
-    ds_flx = search_and_open("M2T1NXFLX", dates=dates, fail_on_empty=False)
-    ds_lnd = search_and_open("M2T1NXLND", dates=dates, fail_on_empty=False)
-    ds_aer = search_and_open("M2T1NXAER", dates=dates, fail_on_empty=False)
+    t_start = time.perf_counter()
+    pool = ThreadPoolExecutor(max_workers=len(COLLECTIONS))
+    futures = {key: pool.submit(_run, key, short_name, fail_on_empty)
+               for key, (short_name, fail_on_empty) in COLLECTIONS.items()}
     
-    return {
-        'atmospheric': ds_atm,
-        'flux': ds_flx,
-        'land': ds_lnd,
-        'aerosol': ds_aer
-    }
+    results = {}
+    timings = {}
+    try:
+        for key, future in futures.items():
+            short_name, fail_on_empty = COLLECTIONS[key]
+            # Zaman aşımı tüm aşamanın başlangıcından itibaren sayılır
+            remaining = max(0.0, timeout - (time.perf_counter() - t_start))
+            try:
+                result, elapsed = future.result(timeout=remaining)
+            except FutureTimeoutError:
+                timings[short_name] = None
+                if fail_on_empty:
+                    raise RuntimeError(f"Timeout after {timeout:.0f}s fetching {short_name}")
+                print(f"[WARN] {short_name} zaman aşımı ({timeout:.0f}s), atlanıyor")
+                results[key] = None
+                continue
+            except Exception as e:
+                if fail_on_empty:
+                    raise
+                print(f"[WARN] {short_name} alınamadı: {e}")
+                timings[short_name] = None
+                results[key] = None
+                continue
+            timings[short_name] = round(elapsed, 3)
+            print(f"[TIME] {short_name}: {elapsed:.2f}s")
+            results[key] = result
+    finally:
+        # Zaman aşımına uğrayan işleri bekleme
+        pool.shutdown(wait=False, cancel_futures=True)
+    return results, timings
+
+def fetch_weather_data(dates=DATES, timeout=FETCH_TIMEOUT):
+    """Tüm hava durumu verilerini eşzamanlı çek"""
+    print("[STEP] Fetching datasets...")
+    # Anlık modda sadece TIME_INDEX adımı okunur: tek granül (eski davranış), indirmeden uzaktan tembel okuma
+    datasets, timings = run_collections(
+        lambda key, short_name, fail_on_empty: search_and_open(short_name, dates=dates, fail_on_empty=fail_on_empty,
+                                                              multi_granule=MULTI_GRANULE and AGGREGATE_TIME,
+                                                              use_cache=AGGREGATE_TIME),
+        timeout)
+    datasets['timings'] = timings
+    return datasets
+
+# Değişken -> (koleksiyon, aday değişken adları; ilk bulunan kullanılır)
+VARIABLE_CANDIDATES = {
+    'precipitation': ('flux', ["PRECTOT", "PRECTOTCORR", "PRATE", "PRECIP", "PRECC"]),
+    'temperature': ('atmospheric', ["T2M", "TMP2m", "TEMP_2M", "T2MDEW", "T10M"]),
+    'u_wind': ('atmospheric', ["U10M", "U2M", "U_10M", "U10", "U10M_AV"]),
+    'v_wind': ('atmospheric', ["V10M", "V2M", "V_10M", "V10", "V10M_AV"]),
+    'soil_moisture': ('land', ["GWETROOT", "GWETPROF", "GWETTOP", "SOILM", "SMROOT"]),
+    'aerosol': ('aerosol', ["TOTEXTTAU", "AOD", "AOD550", "DUEXTTAU", "DUCMASS"]),
+}
+
+def collection_variables(collection, ds):
+    """Tek koleksiyonun veri setinden o koleksiyona ait değişkenler (bulunamayan None)"""
+    variables = {}
+    for key, (source, names) in VARIABLE_CANDIDATES.items():
+        if source != collection:
+            continue
+        variables[key] = None
+        if ds is not None:
+            for name in names:
+                if name in ds.variables:
+                    variables[key] = ds[name]
+                    break
+    return variables
 
 def extract_variables(datasets):
     """Veri setlerinden değişkenleri çıkar"""
-    ds_atm = datasets['atmospheric']
-    ds_flx = datasets['flux']
-    ds_lnd = datasets['land']
-    ds_aer = datasets['aerosol']
-    
-    # Yağış
-    precip = None
-    if ds_flx is not None:
-        for cand in ["PRECTOT", "PRECTOTCORR", "PRATE", "PRECIP", "PRECC"]:
-            if cand in ds_flx.variables:
-                precip = ds_flx[cand]
-                break
-    
-    # Sıcaklık
-    temp = safe_var(ds_atm, ["T2M", "TMP2m", "TEMP_2M", "T2MDEW", "T10M"])
-    
-    # Rüzgar
-    u_wind = None
-    v_wind = None
-    for u_c in ["U10M", "U2M", "U_10M", "U10", "U10M_AV"]:
-        if u_c in ds_atm.variables:
-            u_wind = ds_atm[u_c]
-            break
-    for v_c in ["V10M", "V2M", "V_10M", "V10", "V10M_AV"]:
-        if v_c in ds_atm.variables:
-            v_wind = ds_atm[v_c]
-            break
-    
-    # Toprak nemi
-    soil = None
-    if ds_lnd is not None:
-        for cand in ["GWETROOT", "GWETPROF", "GWETTOP", "SOILM", "SMROOT"]:
-            if cand in ds_lnd.variables:
-                soil = ds_lnd[cand]
-                break
-    
-    # Aerosol
-    aerosol = None
-    if ds_aer is not None:
-        for cand in ["TOTEXTTAU", "AOD", "AOD550", "DUEXTTAU", "DUCMASS"]:
-            if cand in ds_aer.variables:
-                aerosol = ds_aer[cand]
-                break
+    variables = {}
+    for collection in COLLECTIONS:
+        variables.update(collection_variables(collection, datasets[collection]))
+    # Sıcaklık zorunlu
+    if variables['temperature'] is None:
+        safe_var(datasets['atmospheric'], VARIABLE_CANDIDATES['temperature'][1])
+    return {key: variables[key] for key in VARIABLE_CANDIDATES}
+
+def _chunk_ranges(n, parts):
+    """[0, n) aralığını yaklaşık eşit parçalara böl"""
+    bounds = np.linspace(0, n, max(1, parts) + 1).astype(int)
+    return [(int(a), int(b)) for a, b in zip(bounds[:-1], bounds[1:]) if b > a]
+
+def drought_index_kernel(values, out=None, workers=DROUGHT_WORKERS):
+    """Tek okuma + yerinde işlemlerle 0..1 kuraklık indeksi (ham NumPy tamponu üzerinde)
+    
+    Eşdeğer: d = clip(1 - x / (nanmean(x) + 1e-9), 0, 2); (d - min(d)) / (max(d) - min(d) + 1e-9)
+    clip monoton olduğundan min(d)/max(d), x'in min/max'ından türetilir; ikinci bir geçiş gerekmez.
+    """
+    x = np.ascontiguousarray(values)
+    if not np.issubdtype(x.dtype, np.floating):
+        x = x.astype(np.float64)
+    if out is None:
+        out = np.empty_like(x)
+    flat_x = x.reshape(-1)
+    flat_out = out.reshape(-1)
+    
+    parallel = workers > 1 and flat_x.size >= DROUGHT_PARALLEL_MIN_SIZE
+    ranges = _chunk_ranges(flat_x.size, workers if parallel else 1)
+    
+    def _run(func):
+        if not parallel:
+            return [func(r) for r in ranges]
+        with ThreadPoolExecutor(max_workers=len(ranges)) as pool:
+            return list(pool.map(func, ranges))
+    
+    # 1. geçiş: toplam, sayı, min, max (blok bazında, NaN atlanır)
+    def _reduce(r):
+        c = flat_x[r[0]:r[1]]
+        valid = c == c  # NaN olmayanlar
+        n = int(np.count_nonzero(valid))
+        if n == 0:
+            return 0.0, 0, np.inf, -np.inf
+        total = float(np.add.reduce(c, where=valid, dtype=np.float64))
+        return total, n, float(np.fmin.reduce(c)), float(np.fmax.reduce(c))
+    
+    parts = _run(_reduce)
+    count = sum(p[1] for p in parts)
+    if count == 0:
+        flat_out[...] = np.nan
+        return out
+    mean = sum(p[0] for p in parts) / count
+    x_min = min(p[2] for p in parts)
+    x_max = max(p[3] for p in parts)
+    
+    scale = -1.0 / (mean + 1e-9)
+    ends = np.clip([1.0 + x_min * scale, 1.0 + x_max * scale], 0.0, 2.0)
+    d_min, d_max = float(ends.min()), float(ends.max())
+    norm = 1.0 / (d_max - d_min + 1e-9)
+    
+    # 2. geçiş: tek okuma, geri kalanı çıktı tamponunda yerinde
+    def _transform(r):
+        o = flat_out[r[0]:r[1]]
+        np.multiply(flat_x[r[0]:r[1]], scale, out=o)
+        o += 1.0
+        np.maximum(o, 0.0, out=o)
+        np.minimum(o, 2.0, out=o)
+        o -= d_min
+        o *= norm
+    
+    _run(_transform)
+    return out
+
+def compute_drought_index(field):
+    """Nem/yağış alanından 0..1 kuraklık indeksi (alanın kendi ortalamasına göre)"""
+    data = drought_index_kernel(field.values)
+    return xr.DataArray(data, coords=field.coords, dims=field.dims, name='drought_index')
+
+def days_of_year(da):
+    """DataArray'in kapsadığı gün-yıl değerleri (zaman yoksa None)"""
+    if 'time' not in da.coords:
+        return None
+    return np.unique(pd.DatetimeIndex(np.atleast_1d(da['time'].values)).dayofyear)
+
+def select_drought_index(soil, precip, soil_name=None, precip_name=None, doys=None, template=None):
+    """Kuraklık indeksi: klimatoloji varsa anomali, yoksa alanın kendi ortalamasına göre"""
+    if doys is not None:
+        if soil is not None and soil_name == 'GWETROOT':
+            di = climatology_drought_index(soil, 'GWETROOT', doys)
+            if di is not None:
+                return di, 'climatology_GWETROOT'
+        if precip is not None and precip_name in ('PRECTOT', 'PRECTOTCORR'):
+            di = climatology_drought_index(precip, 'PRECTOT', doys)
+            if di is not None:
+                return di, 'climatology_PRECTOT'
+    if soil is not None:
+        return compute_drought_index(soil), 'relative_soil'
+    if precip is not None:
+        return compute_drought_index(precip), 'relative_precip'
+    return xr.zeros_like(template) * 0.0, 'none'
+
+class RunningStats:
+    """Zaman boyunca akan istatistik: hücre bazında toplam/min/max + yüzdelikler için histogram"""
+
+    def __init__(self, shape, hist_range):
+        self.count = np.zeros(shape, dtype=np.int64)
+        self.sum = np.zeros(shape, dtype=np.float64)
+        self.min = np.full(shape, np.inf)
+        self.max = np.full(shape, -np.inf)
+        lo, hi, nbins = hist_range
+        self.edges = np.linspace(lo, hi, nbins + 1)
+        self.hist = np.zeros(nbins, dtype=np.int64)
+
+    def update(self, block):
+        """(zaman, lat, lon) bloğunu biriktir"""
+        valid = ~np.isnan(block)
+        self.count += valid.sum(axis=0)
+        self.sum += np.where(valid, block, 0.0).sum(axis=0)
+        with np.errstate(invalid='ignore'):
+            self.min = np.fmin(self.min, np.where(valid, block, np.inf).min(axis=0))
+            self.max = np.fmax(self.max, np.where(valid, block, -np.inf).max(axis=0))
+        values = np.clip(block[valid], self.edges[0], self.edges[-1])
+        self.hist += np.histogram(values, bins=self.edges)[0]
+
+    def merge(self, other):
+        """Başka bir dönemin (ör. günün) istatistiklerini ekle; sabit kutular sayesinde birleşim kesin"""
+        self.count += other.count
+        self.sum += other.sum
+        self.min = np.fmin(self.min, other.min)
+        self.max = np.fmax(self.max, other.max)
+        self.hist += other.hist
+        return self
+
+    @classmethod
+    def from_arrays(cls, count, total, vmin, vmax, hist, hist_range):
+        """Saklanmış dizilerden yeniden oluştur"""
+        stats = cls(np.shape(count), hist_range)
+        stats.count[...] = count
+        stats.sum[...] = total
+        stats.min[...] = vmin
+        stats.max[...] = vmax
+        stats.hist[...] = hist
+        return stats
+
+    def mean_field(self):
+        """Hücre bazında dönem ortalaması"""
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return np.where(self.count > 0, self.sum / np.maximum(self.count, 1), np.nan)
+
+    def percentile(self, q):
+        """Histogramdan yaklaşık yüzdelik (kutu içi doğrusal)"""
+        total = self.hist.sum()
+        if total == 0:
+            return None
+        cdf = np.cumsum(self.hist)
+        target = q / 100.0 * total
+        i = int(np.searchsorted(cdf, target))
+        i = min(i, len(self.hist) - 1)
+        prev = cdf[i - 1] if i > 0 else 0
+        frac = (target - prev) / self.hist[i] if self.hist[i] else 0.0
+        return float(self.edges[i] + frac * (self.edges[i + 1] - self.edges[i]))
+
+    def summary(self):
+        """Bölge geneli istatistikler"""
+        if not self.count.any():
+            return None
+        valid = self.count > 0
+        out = {
+            'mean': float(self.sum[valid].sum() / self.count[valid].sum()),
+            'min': float(self.min[valid].min()),
+            'max': float(self.max[valid].max()),
+        }
+        for q in PERCENTILES:
+            out[f'p{q}'] = self.percentile(q)
+        return out
+
+def step_seconds(da, default=3600.0):
+    """Zaman adımı süresi (saniye)"""
+    if 'time' not in da.dims or da.sizes['time'] < 2:
+        return default
+    dt = np.diff(da['time'].values[:2])[0]
+    try:
+        return float(dt / np.timedelta64(1, 's'))
+    except TypeError:
+        return default
+
+# Ham değişken -> (işlenmiş alan adı, birim dönüşümü)
+STAT_SOURCES = {
+    'temperature': ('temperature_c', lambda x: x - 273.15),
+    'precipitation': ('precipitation_mm_day', lambda x: x * 86400.0),
+    'soil_moisture': ('soil_moisture', None),
+    'aerosol': ('aerosol', None),
+    'u_wind': ('u_wind', None),
+    'v_wind': ('v_wind', None),
+}
+
+def _time_blocks(sources, time_chunk):
+    """Kaynakları ortak (birleşim) zaman ekseninde bloklara böl; her blokta {alan: o zamanlardaki dilim}
+
+    Koleksiyonların adım sayısı farklı olabilir (eksik/geç granül): her kaynak kendi adımlarıyla,
+    zaman etiketine göre katılır; konuma göre eşleştirme yapılmaz. Zaman koordinatı yoksa konuma göre.
+    """
+    if not all('time' in da.coords for da, _ in sources.values()):
+        n_steps = max(da.sizes['time'] for da, _ in sources.values())
+        for start in range(0, n_steps, time_chunk):
+            yield {key: da.isel(time=slice(start, start + time_chunk)) for key, (da, _) in sources.items()
+                   if start < da.sizes['time']}
+        return
+    times = np.unique(np.concatenate([da['time'].values for da, _ in sources.values()]))
+    for start in range(0, times.size, time_chunk):
+        block_times = times[start:start + time_chunk]
+        blocks = {}
+        for key, (da, _) in sources.items():
+            idx = np.flatnonzero(np.isin(da['time'].values, block_times))
+            if idx.size:
+                blocks[key] = da.isel(time=idx)
+        yield blocks
+
+def accumulate_stats(sources, shape, time_chunk=TIME_CHUNK):
+    """{alan: (zaman küpü, dönüşüm)} kaynaklarını zaman bloklarıyla RunningStats'a biriktir (rüzgar hızı u/v'den)"""
+    stats = {k: RunningStats(shape, HIST_RANGES.get(k, (0.0, 1.0, 1))) for k in sources}
+    has_wind = 'u_wind' in sources and 'v_wind' in sources
+    if has_wind:
+        stats['wind_speed'] = RunningStats(shape, HIST_RANGES['wind_speed'])
+    
+    # Akış: her seferinde sadece bir zaman bloğu yüklenir
+    for block_das in _time_blocks(sources, time_chunk):
+        blocks = {}
+        for key, da in block_das.items():
+            fn = sources[key][1]
+            block = np.asarray(da.values, dtype=np.float64)
+            blocks[key] = fn(block) if fn else block
+            stats[key].update(blocks[key])
+        if has_wind and 'u_wind' in blocks and 'v_wind' in blocks:
+            u, v = blocks['u_wind'], blocks['v_wind']
+            tu, tv = (block_das[k]['time'].values if 'time' in block_das[k].coords else None for k in ('u_wind', 'v_wind'))
+            if tu is not None and tv is not None and not np.array_equal(tu, tv):
+                # Sadece iki bileşenin de bulunduğu adımlar
+                u, v = u[np.isin(tu, tv)], v[np.isin(tv, tu)]
+            stats['wind_speed'].update(np.sqrt(u ** 2 + v ** 2))
+    return stats
+
+def aggregated_fields(stats, template, soil_name=None, precip_name=None, doys=None, precip_step_seconds=3600.0,
+                      n_steps=0, period=None):
+    """Biriktirilmiş dönem istatistiklerinden process_variables çıktısı"""
+    def _field(key):
+        if key not in stats:
+            return None
+        return xr.DataArray(stats[key].mean_field(), coords=template.coords, dims=template.dims, name=key)
+    
+    soil_s = _field('soil_moisture')
+    precip_mm_day = _field('precipitation_mm_day')
+    temp_c = _field('temperature_c')
+    drought_index, drought_method = select_drought_index(
+        soil_s, precip_mm_day, soil_name=soil_name, precip_name=precip_name, doys=doys, template=temp_c)
+    
+    period_stats = {k: s.summary() for k, s in stats.items() if k not in ('u_wind', 'v_wind')}
+    precip_total = None
+    if 'precipitation_mm_day' in stats:
+        # mm/gün ortalamasından hücre bazında dönem toplamı (mm)
+        total = stats['precipitation_mm_day'].sum * precip_step_seconds / 86400.0
+        precip_total = xr.DataArray(total, coords=template.coords, dims=template.dims, name='precipitation_total_mm')
+        if period_stats.get('precipitation_mm_day'):
+            period_stats['precipitation_mm_day']['total_mm'] = float(np.nanmean(total))
     
     return {
-        'precipitation': precip,
-        'temperature': temp,
-        'u_wind': u_wind,
-        'v_wind': v_wind,
-        'soil_moisture': soil,
-        'aerosol': aerosol
+        'precipitation_mm_day': precip_mm_day,
+        'precipitation_total_mm': precip_total,
+        'temperature_c': temp_c,
+        'u_wind': _field('u_wind'),
+        'v_wind': _field('v_wind'),
+        'wind_speed': _field('wind_speed'),
+        'soil_moisture': soil_s,
+        'aerosol': _field('aerosol'),
+        'drought_index': drought_index,
+        'drought_method': drought_method,
+        'stats': {
+            'n_timesteps': int(n_steps),
+            'period': period,
+            'variables': period_stats
+        }
     }
 
-def process_variables(variables, bbox=BBOX, time_index=TIME_INDEX):
+def process_variables_aggregated(variables, bbox=BBOX, time_chunk=TIME_CHUNK):
+    """Tüm zaman adımlarını bloklar halinde işle; küpün tamamını bellekte tutmadan dönem istatistikleri"""
+    subsets = {k: subset_time_space(v, None, bbox) if v is not None else None for k, v in variables.items()}
+    temp_s = subsets['temperature']
+    if 'time' not in temp_s.dims:
+        temp_s = temp_s.expand_dims('time')
+    subsets['temperature'] = temp_s
+    template = temp_s.isel(time=0, drop=True)
+    n_steps = temp_s.sizes['time']
+    
+    # Alan -> (ham veri, dönüşüm)
+    sources = {}
+    for key, (name, fn) in STAT_SOURCES.items():
+        da = subsets.get(key)
+        if da is not None:
+            sources[name] = (da if 'time' in da.dims else da.expand_dims('time'), fn)
+    stats = accumulate_stats(sources, template.shape, time_chunk)
+    
+    times = temp_s['time'].values if 'time' in temp_s.coords else None
+    precip = sources.get('precipitation_mm_day')
+    return aggregated_fields(
+        stats, template,
+        soil_name=getattr(variables['soil_moisture'], 'name', None),
+        precip_name=getattr(variables['precipitation'], 'name', None),
+        doys=days_of_year(temp_s),
+        precip_step_seconds=step_seconds(precip[0]) if precip is not None else 3600.0,
+        n_steps=n_steps,
+        period=[str(times[0]), str(times[-1])] if times is not None and len(times) else None)
+
+def process_variables(variables, bbox=BBOX, time_index=TIME_INDEX, aggregate=AGGREGATE_TIME):
     """Değişkenleri işle ve türetilmiş veriler oluştur"""
+    if aggregate:
+        return process_variables_aggregated(variables, bbox)
+    
     # Alt kümelere ayır
     precip_s = subset_time_space(variables['precipitation'], time_index, bbox) if variables['precipitation'] is not None else None
     temp_s = subset_time_space(variables['temperature'], time_index, bbox) - 273.15  # Kelvin'den Celsius'a
@@ -179,22 +782,15 @@ def process_variables(variables, bbox=BBOX, time_index=TIME_INDEX):
     # Türetilmiş veriler
     wind_speed = np.sqrt(u_s**2 + v_s**2) if (u_s is not None and v_s is not None) else None
     
-    # Kuraklık indeksi hesapla
-    if soil_s is not None:
-        soil_clim = float(np.nanmean(soil_s))
-        drought_index = 1.0 - (soil_s / (soil_clim + 1e-9))
-        drought_index = drought_index.clip(min=0.0, max=2.0)
-        drought_index = (drought_index - float(drought_index.min())) / (float(drought_index.max()) - float(drought_index.min()) + 1e-9)
-    elif precip_s is not None:
-        precip_mean = float(np.nanmean(precip_s))
-        drought_index = 1.0 - (precip_s / (precip_mean + 1e-9))
-        drought_index = drought_index.clip(min=0.0, max=2.0)
-        drought_index = (drought_index - float(drought_index.min())) / (float(drought_index.max()) - float(drought_index.min()) + 1e-9)
-    else:
-        drought_index = xr.zeros_like(temp_s) * 0.0
-    
     precip_mm_day = precip_s * 86400.0 if precip_s is not None else None
     
+    # Kuraklık indeksi hesapla (klimatoloji mm/gün biriminde)
+    drought_index, drought_method = select_drought_index(
+        soil_s, precip_mm_day,
+        soil_name=getattr(variables['soil_moisture'], 'name', None),
+        precip_name=getattr(variables['precipitation'], 'name', None),
+        doys=days_of_year(temp_s), template=temp_s)
+    
     return {
         'precipitation_mm_day': precip_mm_day,
         'temperature_c': temp_s,
@@ -203,8 +799,175 @@ def process_variables(variables, bbox=BBOX, time_index=TIME_INDEX):
         'wind_speed': wind_speed,
         'soil_moisture': soil_s,
         'aerosol': aero_s,
-        'drought_index': drought_index
+        'drought_index': drought_index,
+        'drought_method': drought_method
+    }
+
+def day_range(dates):
+    """Tarih aralığındaki günler (iki uç dahil)"""
+    start, end = (pd.Timestamp(str(d).strip()).normalize() for d in dates)
+    return list(pd.date_range(start, end, freq='D'))
+
+def contiguous_runs(days):
+    """Sıralı günleri ardışık (başlangıç, bitiş) aralıklarına grupla"""
+    runs = []
+    for day in days:
+        if runs and day - runs[-1][1] == pd.Timedelta(days=1):
+            runs[-1][1] = day
+        else:
+            runs.append([day, day])
+    return [tuple(run) for run in runs]
+
+def daily_stats(variables, bbox=BBOX):
+    """Bir koleksiyonun değişkenlerinden gün başına istatistik: {gün: (stats, şablon, bilgi)}"""
+    subsets = {key: subset_time_space(da, None, bbox) for key, da in variables.items() if da is not None}
+    subsets = {key: da for key, da in subsets.items() if 'time' in da.dims}
+    if not subsets:
+        return {}
+    ref = next(iter(subsets.values()))
+    template = ref.isel(time=0, drop=True)
+    dt = step_seconds(ref)
+    expected = int(round(86400.0 / dt))
+    sources_names = {STAT_SOURCES[key][0]: getattr(variables[key], 'name', None) for key in subsets}
+    times = ref['time'].values
+    day_of = pd.DatetimeIndex(times).normalize()
+    
+    days = {}
+    for day in day_of.unique():
+        idx = np.flatnonzero(day_of == day)
+        steps = slice(int(idx[0]), int(idx[-1]) + 1)
+        sources = {STAT_SOURCES[key][0]: (da.isel(time=steps), STAT_SOURCES[key][1]) for key, da in subsets.items()}
+        info = {
+            'n_steps': len(idx),
+            'step_seconds': dt,
+            'first_time': str(times[idx[0]]),
+            'last_time': str(times[idx[-1]]),
+            # Eksik saatli gün (ör. henüz yayımlanmamış granül) depoya yazılmaz
+            'complete': len(idx) >= expected,
+            'sources': sources_names
+        }
+        days[day] = (accumulate_stats(sources, template.shape), template, info)
+    return days
+
+def stats_to_dataset(stats, template, info):
+    """Günün istatistiklerini saklanabilir veri setine çevir"""
+    dims = template.dims
+    data_vars = {}
+    for key, s in stats.items():
+        data_vars[f'{key}_count'] = (dims, s.count.astype(np.int32))
+        data_vars[f'{key}_sum'] = (dims, s.sum)
+        data_vars[f'{key}_min'] = (dims, s.min)
+        data_vars[f'{key}_max'] = (dims, s.max)
+        data_vars[f'{key}_hist'] = ((f'{key}_bin',), s.hist)
+    ds = xr.Dataset(data_vars, coords={d: template[d].values for d in dims})
+    ds.attrs = {
+        'n_steps': info['n_steps'],
+        'step_seconds': info['step_seconds'],
+        'first_time': info['first_time'],
+        'last_time': info['last_time'],
+        'sources': json.dumps(info['sources'])
     }
+    return ds
+
+def dataset_to_stats(ds):
+    """Saklanmış günü (stats, şablon, bilgi) olarak aç"""
+    stats = {}
+    dims = None
+    for name in ds.data_vars:
+        if not name.endswith('_count'):
+            continue
+        key = name[:-len('_count')]
+        dims = ds[name].dims
+        stats[key] = RunningStats.from_arrays(
+            ds[f'{key}_count'].values, ds[f'{key}_sum'].values, ds[f'{key}_min'].values,
+            ds[f'{key}_max'].values, ds[f'{key}_hist'].values, HIST_RANGES.get(key, (0.0, 1.0, 1)))
+    template = xr.DataArray(np.zeros([ds.sizes[d] for d in dims]), coords={d: ds[d].values for d in dims}, dims=dims)
+    info = {
+        'n_steps': int(ds.attrs['n_steps']),
+        'step_seconds': float(ds.attrs['step_seconds']),
+        'first_time': ds.attrs['first_time'],
+        'last_time': ds.attrs['last_time'],
+        'complete': True,
+        'sources': json.loads(ds.attrs['sources'])
+    }
+    return stats, template, info
+
+def collect_daily_stats(collection, short_name, days, bbox=BBOX, fail_on_empty=True):
+    """Koleksiyonun günlerini depodan oku, eksik ardışık aralıkları çekip işle ve depoya yaz"""
+    found = {}
+    missing = []
+    for day in days:
+        ds = daily_store.load(short_name, bbox, day)
+        if ds is None:
+            missing.append(day)
+        else:
+            found[day] = dataset_to_stats(ds)
+    print(f"[CACHE] {short_name}: {len(found)} gün depodan, {len(missing)} gün çekilecek")
+    
+    wanted = set(missing)
+    for start, end in contiguous_runs(missing):
+        ds = search_and_open(short_name, dates=(f"{start:%Y-%m-%d}", f"{end:%Y-%m-%d}"), bbox=bbox, fail_on_empty=False)
+        if ds is None:
+            continue
+        for day, item in daily_stats(collection_variables(collection, ds), bbox).items():
+            if day not in wanted:  # Aralık sınırındaki granüller
+                continue
+            found[day] = item
+            if item[2]['complete']:
+                daily_store.save(short_name, bbox, day, stats_to_dataset(*item))
+    if not found and fail_on_empty:
+        raise RuntimeError(f"No results for {short_name} {days[0]:%Y-%m-%d}..{days[-1]:%Y-%m-%d} {bbox}")
+    return found
+
+def fetch_and_process_incremental(dates=DATES, bbox=BBOX, timeout=FETCH_TIMEOUT):
+    """Toplu mod: günlük depodaki günleri kullan, sadece eksikleri çek; (process_variables çıktısı, zamanlamalar)
+
+    Gün istatistikleri toplanabilir (toplam, sayı, min/maks, sabit kutulu histogram) olduğundan
+    sonuç tüm aralığı yeniden işlemekle aynıdır; kayan günlük analizlerde iş O(yeni gün) olur.
+    """
+    print("[STEP] Fetching datasets (daily store)...")
+    days = day_range(dates)
+    per_collection, timings = run_collections(
+        lambda key, short_name, fail_on_empty: collect_daily_stats(key, short_name, days, bbox, fail_on_empty),
+        timeout)
+    
+    merged = {}
+    infos = {}
+    template = None
+    for collection in COLLECTIONS:
+        items = per_collection.get(collection) or {}
+        for day in sorted(items):
+            stats, day_template, info = items[day]
+            if template is None and collection == 'atmospheric':
+                template = day_template
+            infos.setdefault(collection, []).append((day, info))
+            for key, s in stats.items():
+                if key in merged:
+                    merged[key].merge(s)
+                else:
+                    merged[key] = s
+    
+    atm = infos.get('atmospheric', [])
+    sources = {}
+    for collection_infos in infos.values():
+        sources.update(collection_infos[-1][1]['sources'])
+    flux = infos.get('flux')
+    processed = aggregated_fields(
+        merged, template,
+        soil_name=sources.get('soil_moisture'),
+        precip_name=sources.get('precipitation_mm_day'),
+        doys=np.unique(pd.DatetimeIndex([day for day, _ in atm]).dayofyear),
+        precip_step_seconds=flux[-1][1]['step_seconds'] if flux else 3600.0,
+        n_steps=sum(info['n_steps'] for _, info in atm),
+        period=[atm[0][1]['first_time'], atm[-1][1]['last_time']])
+    return processed, timings
+
+def fetch_and_process(dates=DATES, bbox=BBOX):
+    """Veriyi çek ve işle; (process_variables çıktısı, zamanlamalar)"""
+    if AGGREGATE_TIME and DAILY_STORE:
+        return fetch_and_process_incremental(dates, bbox)
+    datasets = fetch_weather_data(dates=dates)
+    return process_variables(extract_variables(datasets), bbox), datasets.get('timings')
 
 def create_summary(processed_data, dates, bbox=BBOX):
     """Analiz özetini oluştur"""
@@ -217,4 +980,14 @@ def create_summary(processed_data, dates, bbox=BBOX):
         'drought_index_mean': float(np.nanmean(processed_data['drought_index'])),
         'aod_mean': float(np.nanmean(processed_data['aerosol'])) if processed_data['aerosol'] is not None else None
     }
+    summary['drought_method'] = processed_data.get('drought_method')
+    # Zaman serisi modunda dönem istatistikleri
+    stats = processed_data.get('stats')
+    if stats:
+        summary['time_mode'] = 'aggregate'
+        summary['n_timesteps'] = stats['n_timesteps']
+        summary['period'] = stats['period']
+        summary['period_stats'] = stats['variables']
+    else:
+        summary['time_mode'] = 'snapshot'
     return summary